@@ -0,0 +1,60 @@
+"""Time get_events regrouping rows into events with several control modes.
+
+Usage: python benchmarks/get_events.py --modes 1 2 4 8 --events 10000 -o events.json
+"""
+
+import argparse
+import json
+import tempfile
+from pathlib import Path
+
+from timing import measure
+
+from sep2tools.event_examples import example_schedule
+from sep2tools.events_db import EventsStore
+
+
+def run(modes: list[int], num_events: int, repeat: int) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_modes in modes:
+            events = example_schedule(num_events, num_modes, start=1780000000)
+            with EventsStore(str(Path(tmp) / f"{num_modes}.db")) as store:
+                store.add_events(events)
+                store.execute("ANALYZE")
+                res = {
+                    "rows": num_modes * len(events),
+                    "get_events": measure(
+                        lambda s=store: s.get_events("PRG0"), repeat=repeat
+                    ),
+                    # The same rows without building or validating any models
+                    "mode_event_rows": measure(
+                        lambda s=store: [
+                            s.get_mode_event_rows("PRG0", x)
+                            for x in s.get_program_modes("PRG0")
+                        ],
+                        repeat=repeat,
+                    ),
+                }
+            results[num_modes] = res
+            timings = {
+                k: round(v["median_s"], 4) for k, v in res.items() if k != "rows"
+            }
+            print(f"{num_modes} modes: {timings}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--events", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("-o", "--output", type=Path)
+    args = parser.parse_args()
+    results = run(args.modes, args.events, args.repeat)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Record query plans and latency of the hot events_db queries.
+
+Usage: python benchmarks/query_plans.py --sizes 10000 100000 1000000 -o plans.json
+"""
+
+import argparse
+import json
+import random
+import tempfile
+from collections.abc import Callable
+from pathlib import Path
+
+from timing import measure
+
+from sep2tools.events_db import EVENT_COLS, EventsStore
+
+MODES = ("opModExpLimW", "opModImpLimW")
+START = 1780000000
+STATEMENT_KEYWORDS = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+
+def fill_events(store: EventsStore, num_rows: int, num_programs: int = 10):
+    """Insert synthetic 5 minute events, a few re-issued with a newer creation"""
+    rng = random.Random(num_rows)
+    start = START
+    rows_per_program = num_rows // (num_programs * len(MODES))
+    cols = ", ".join(EVENT_COLS)
+    marks = ", ".join("?" for _ in EVENT_COLS)
+    sql = f"INSERT OR REPLACE INTO events ({cols}) VALUES ({marks})"
+    with store.transaction() as db:
+        for p in range(num_programs):
+            for i in range(rows_per_program):
+                slot = i if rng.random() > 0.05 else i - 1  # Some duplicates
+                db.conn.executemany(
+                    sql,
+                    [
+                        (
+                            f"{p:04d}{i:012d}",
+                            f"PRG{p}",
+                            1,
+                            start + i,
+                            rng.choice((0, 1, 999)),
+                            0,
+                            start + slot * 300,
+                            300,
+                            0,
+                            0,
+                            mode,
+                            rng.randint(15, 100) * 100,
+                            0,
+                        )
+                        for mode in MODES
+                    ],
+                )
+
+
+def query_plans(store: EventsStore, func: Callable) -> dict:
+    """Run ``func`` once, recording the plans of the statements it ran"""
+    statements = []
+    store.db.conn.set_trace_callback(statements.append)
+    try:
+        res = func(store)
+    finally:
+        store.db.conn.set_trace_callback(None)
+    sql = [x for x in statements if x.lstrip().startswith(STATEMENT_KEYWORDS)]
+    plans = [
+        [x["detail"] for x in store.query(f"EXPLAIN QUERY PLAN {stmt}")]
+        for stmt in dict.fromkeys(sql)
+    ]
+    return {
+        "result_len": len(res) if hasattr(res, "__len__") else res,
+        "plans": plans,
+    }
+
+
+FUNCS = {
+    "get_mode_events": lambda s: s.get_mode_events("PRG0", MODES[0]),
+    "get_events": lambda s: s.get_events("PRG0"),
+    "supersede_overlapping": lambda s: s.supersede_overlapping(),
+    "update_status": lambda s: s.update_status(),
+    # Worst case, as every stored event ends after the first start
+    "get_active_control": lambda s: [s.get_active_control("PRG0", MODES[0], START)],
+}
+
+
+def run_size(tmp: Path, size: int, repeat: int) -> dict:
+    counter = iter(range(10**9))
+    with EventsStore(str(tmp / f"{size}.db")) as base:
+        fill_events(base, size)
+        base.execute("ANALYZE")
+
+        def copied_store() -> tuple[EventsStore]:
+            """A copy of the filled store, as some of the functions change it"""
+            store = EventsStore(str(tmp / f"{size}_{next(counter)}.db"))
+            base.db.conn.backup(store.db.conn)
+            return (store,)
+
+        res = {}
+        for name, func in FUNCS.items():
+            with copied_store()[0] as store:
+                res[name] = query_plans(store, func)
+            res[name] |= measure(func, copied_store, repeat)
+    return res
+
+
+def run(sizes: list[int], repeat: int) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            res = run_size(Path(tmp), size, repeat)
+            results[size] = res
+            timings = {k: round(v["median_s"], 4) for k, v in res.items()}
+            print(f"{size} rows: {timings}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("-o", "--output", type=Path)
+    args = parser.parse_args()
+    results = run(args.sizes, args.repeat)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
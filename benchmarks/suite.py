@@ -0,0 +1,103 @@
+"""Time the event overlap, condense and events_db operations on synthetic schedules.
+
+Usage: python benchmarks/suite.py --sizes 1000 10000 100000 -o results.json
+"""
+
+import argparse
+import json
+import platform
+import tempfile
+from pathlib import Path
+
+from timing import measure
+
+from sep2tools.event_examples import example_schedule
+from sep2tools.event_overlap import condense_events, non_overlapping_periods
+from sep2tools.events_db import EventsStore
+from sep2tools.times import current_timestamp
+from sep2tools.version import __version__
+
+
+def run_size(tmp: Path, size: int, args: argparse.Namespace) -> dict:
+    # Starting a week ago so remove_old_events has history to clear
+    start = current_timestamp() - 7 * 86400
+    events = example_schedule(
+        size, args.modes, args.programs, args.overlap, start=start, seed=size
+    )
+    times = [
+        (x.intervalStart, x.intervalEnd) for x in events if x.programName == "PRG0"
+    ]
+    counter = iter(range(10**9))
+
+    def new_store() -> tuple[EventsStore]:
+        return (EventsStore(str(tmp / f"{size}_{next(counter)}.db")),)
+
+    def filled_store() -> tuple[EventsStore]:
+        (store,) = new_store()
+        store.add_events(events)
+        return (store,)
+
+    base = filled_store()[0]
+    base.cleanup_events()
+    mode = base.get_program_modes("PRG0")[0]
+    res = {
+        "condense_events": measure(lambda: condense_events(events), repeat=args.repeat),
+        "non_overlapping_periods": measure(
+            lambda: non_overlapping_periods(times), repeat=args.repeat
+        ),
+        "add_events": measure(
+            lambda s: s.add_events(events), new_store, repeat=args.repeat
+        ),
+        "get_events": measure(lambda: base.get_events("PRG0"), repeat=args.repeat),
+        "get_mode_events": measure(
+            lambda: base.get_mode_events("PRG0", mode), repeat=args.repeat
+        ),
+        "cleanup_events": measure(
+            lambda s: s.cleanup_events(), filled_store, repeat=args.repeat
+        ),
+        "remove_old_events": measure(
+            lambda s: s.remove_old_events(), filled_store, repeat=args.repeat
+        ),
+    }
+    base.close()
+    return res
+
+
+def run(args: argparse.Namespace) -> dict:
+    results = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "modes": args.modes,
+            "programs": args.programs,
+            "overlap": args.overlap,
+            "repeat": args.repeat,
+        },
+        "sizes": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            res = run_size(Path(tmp), size, args)
+            results["sizes"][size] = res
+            timings = {k: round(v["median_s"], 4) for k, v in res.items()}
+            print(f"{size} events: {timings}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--modes", type=int, default=2)
+    parser.add_argument("--programs", type=int, default=1)
+    parser.add_argument("--overlap", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("-o", "--output", type=Path)
+    args = parser.parse_args()
+    results = run(args)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""Timing shared by the benchmark scripts."""
+
+import statistics
+import time
+from collections.abc import Callable
+
+
+def measure(func: Callable, setup: Callable | None = None, repeat: int = 5) -> dict:
+    """Time ``func``, passing it a fresh result of ``setup`` on each run so that
+    runs changing a store don't time a pass with nothing left to do.
+    Anything from ``setup`` with a ``close`` method is closed after its run."""
+    times = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        t0 = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - t0)
+        for x in args:
+            if hasattr(x, "close"):
+                x.close()
+    return {"median_s": statistics.median(times), "min_s": min(times)}
@@ -1,5 +1,5 @@
 from datetime import UTC, datetime
-from random import randint
+from random import Random, randint
 
 from sep2tools import generate_mrid
 from sep2tools.event_models import CurrentStatus, DERControl, DERControlBase
@@ -82,3 +82,70 @@ def example_controls(program: str = "EXAMPLEPRG", num: int = 288) -> list[DERCon
         events.append(evt)
         start = start + duration
     return events
+
+
+EXAMPLE_MODES = (
+    "opModExpLimW",
+    "opModImpLimW",
+    "opModGenLimW",
+    "opModLoadLimW",
+    "opModFixedW",
+    "opModTargetW",
+    "opModMaxLimW",
+    "opModConnect",
+)
+
+
+def example_schedule(
+    num_events: int = 288,
+    num_modes: int = 2,
+    num_programs: int = 1,
+    overlap: float = 1.0,
+    start: int | None = None,
+    seed: int = 0,
+) -> list[DERControl]:
+    """A reproducible synthetic schedule for benchmarks.
+
+    Each program gets a default control plus an equal share of ``num_events``
+    5 minute controls, spread so that on average ``overlap`` of them are active
+    at any one time.
+    """
+    if not 1 <= num_modes <= len(EXAMPLE_MODES):
+        raise ValueError(f"num_modes must be between 1 and {len(EXAMPLE_MODES)}")
+    if overlap <= 0:
+        raise ValueError("overlap must be greater than 0")
+    rng = Random(seed)
+    modes = EXAMPLE_MODES[:num_modes]
+    if start is None:
+        start = int(next_interval(5))
+    duration = 300
+    per_program = num_events // num_programs
+    span = max(int(per_program * duration / overlap), duration)
+    events = []
+    for p in range(num_programs):
+        program = f"PRG{p}"
+        default = example_default_control(program=program)
+        default.mRID = f"{p:08X}" + "F" * 24
+        default.creationTime = start - 90_000
+        default.intervalStart = default.creationTime
+        default.controls = [DERControlBase(mode=mode, value=1500) for mode in modes]
+        events.append(default)
+        events.extend(
+            DERControl(
+                mRID=f"{p:08X}{i:024X}",
+                programName=program,
+                programPrimacy=rng.randint(1, 3),
+                creationTime=start - 86_400 + rng.randrange(86_400),
+                currentStatus=CurrentStatus(0),  # Scheduled
+                isDefault=False,
+                intervalStart=start + rng.randrange(0, span, 60),
+                intervalDuration=duration,
+                randomizeStart=10,
+                controls=[
+                    DERControlBase(mode=mode, value=rng.randint(15, 100) * 100)
+                    for mode in modes
+                ],
+            )
+            for i in range(per_program)
+        )
+    return events
@@ -0,0 +1,48 @@
+from bisect import bisect_right
+from collections.abc import Iterable
+
+from .event_models import DERModeControl
+
+
+class ActiveControlIndex:
+    """Look up which control applies at a point in time.
+
+    Built from a condensed schedule, such as from ``condense_mode_events``, so
+    the events are sorted and don't overlap.
+    """
+
+    __slots__ = ("ends", "events", "starts")
+
+    def __init__(self, events: list[DERModeControl]):
+        self.events = events
+        self.starts = [x.intervalStart for x in events]
+        self.ends = [x.intervalEnd for x in events]
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def _event(self, i: int, ts: int) -> DERModeControl | None:
+        if i < 0 or ts >= self.ends[i]:
+            return None  # Before the first event or in a gap
+        return self.events[i]
+
+    def active_at(self, ts: int) -> DERModeControl | None:
+        """Get the control active at a timestamp, if any"""
+        i = bisect_right(self.starts, ts) - 1
+        return self._event(i, ts)
+
+    def active_at_many(self, timestamps: Iterable[int]) -> list[DERModeControl | None]:
+        """Get the control active at each timestamp.
+
+        While the timestamps are increasing, such as telemetry samples, each
+        search only looks from the previous match onwards.
+        """
+        results = []
+        i = 0
+        prev_ts = None
+        for ts in timestamps:
+            lo = max(i, 0) if prev_ts is not None and ts >= prev_ts else 0
+            i = bisect_right(self.starts, ts, lo=lo) - 1
+            results.append(self._event(i, ts))
+            prev_ts = ts
+        return results
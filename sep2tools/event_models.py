@@ -1,6 +1,6 @@
 from enum import IntEnum
 
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 
 
 class CurrentStatus(IntEnum):
@@ -56,3 +56,7 @@ class DERModeControl(BaseModel):
     @property
     def intervalEnd(self) -> int:
         return self.intervalStart + self.intervalDuration
+
+
+# Validating a list of events in one call is faster than a model at a time
+MODE_EVENT_LIST = TypeAdapter(list[DERModeControl])
@@ -1,108 +1,147 @@
+import heapq
+from collections.abc import Callable, Iterator
+
 from .event_models import DERControl, DERModeControl
+from .instrumentation import instrumented
+from .timeline import ModeTimeline
+
 
+def _sweep_periods(
+    events: list[tuple[int, int]],
+) -> Iterator[tuple[int, int, list[int]]]:
+    """Yield each elementary period with the indexes of the events covering it"""
+    time_points = []
+    for i, (start, end) in enumerate(events):
+        if end <= start:
+            # Zero length events still split others, but never cover a period
+            time_points.append((start, 0, -1))
+            time_points.append((end, 0, -1))
+            continue
+        time_points.append((start, 1, i))
+        time_points.append((end, 0, i))
+    time_points.sort()
 
+    active = set()
+    current_start = None
+    for time, is_start, i in time_points:
+        if active and time > current_start:
+            yield current_start, time, sorted(active)
+        if is_start:
+            active.add(i)
+        else:
+            active.discard(i)
+        current_start = time
+
+
+@instrumented("event_overlap.non_overlapping_periods")
 def non_overlapping_periods(events: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    # Only the number of active events matters here, so each point is O(1)
     time_points = []
     for start, end in events:
-        time_points.append((start, "start"))
-        time_points.append((end, "end"))
+        step = 1 if end > start else 0  # Zero length events only split others
+        time_points.append((start, step))
+        time_points.append((end, -step))
     time_points.sort()
 
-    unique_intervals = []
-    current_interval_start = None
-    active_events = 0
-    for time, typ in time_points:
-        if current_interval_start is not None and time > current_interval_start:
-            unique_intervals.append((current_interval_start, time))
-        if typ == "start":
-            active_events += 1
-        elif typ == "end":
-            active_events -= 1
-        current_interval_start = time
-
-    split_events = set()
-    for interval_start, interval_end in unique_intervals:
-        for start, end in events:
-            if start < interval_end and end > interval_start:
-                split_events.add((max(start, interval_start), min(end, interval_end)))
-    return sorted(list(split_events))
+    periods = []
+    active = 0
+    current_start = None
+    for time, step in time_points:
+        if active and time > current_start:
+            periods.append((current_start, time))
+        active += step
+        current_start = time
+    return periods
 
 
+@instrumented("event_overlap.split_overlapping_events")
 def split_overlapping_events(events: list[DERModeControl]) -> list[DERModeControl]:
     new_events = []
     times = [(x.intervalStart, x.intervalStart + x.intervalDuration) for x in events]
-    for xstart, xend in non_overlapping_periods(times):
-        for evt in events:
-            evt_start = evt.intervalStart
-            evt_end = evt.intervalStart + evt.intervalDuration
-            if evt_start >= xend:
-                continue
-            if evt_end <= xstart:
-                continue
-            nevt = evt.model_copy()
+    for xstart, xend, active in _sweep_periods(times):
+        for i in active:
+            nevt = events[i].model_copy()
             nevt.intervalStart = xstart
             nevt.intervalDuration = xend - xstart
             new_events.append(nevt)
     return new_events
 
 
-def condense_mode_events(events: list[DERModeControl]) -> list[DERModeControl]:
-    # First split the events
-    events = split_overlapping_events(events)
+def condense_timeline(timeline: ModeTimeline) -> ModeTimeline:
+    """Condense a timeline to the winning event for each period of time"""
+    starts = timeline.starts
+    durations = timeline.durations
+    primacy = timeline.primacy
+    creation = timeline.creation
+    mrid_index = timeline.mrid_index
+
+    # Sweep the start/end points, keeping a heap of the active events ordered by
+    # lowest primacy, then latest creation time. Ended events are dropped lazily.
+    time_points = []
+    for i in range(len(timeline)):
+        if durations[i] <= 0:
+            continue  # Never active
+        time_points.append((starts[i], 1, i))
+        time_points.append((starts[i] + durations[i], 0, i))
+    time_points.sort()
+
+    rows = []
+    new_starts = []
+    new_durations = []
+    active = set()
+    heap = []
+    current_start = None
+    for time, is_start, i in time_points:
+        if active and time > current_start:
+            while heap[0][2] not in active:
+                heapq.heappop(heap)
+            winner = heap[0][2]
+            if (
+                rows
+                and mrid_index[rows[-1]] == mrid_index[winner]
+                and new_starts[-1] + new_durations[-1] == current_start
+            ):
+                # Restitch an event that was only split by another event
+                new_durations[-1] = time - new_starts[-1]
+            else:
+                rows.append(winner)
+                new_starts.append(current_start)
+                new_durations.append(time - current_start)
+        if is_start:
+            active.add(i)
+            heapq.heappush(heap, (primacy[i], -creation[i], i))
+        else:
+            active.discard(i)
+        current_start = time
+    return timeline.take(rows, new_starts, new_durations)
 
-    # Then pick lowest primacy, or latest creation time
-    event_starts = {}
-    for evt in events:
-        if evt.intervalStart not in event_starts:
-            event_starts[evt.intervalStart] = []
-        event_starts[evt.intervalStart].append(evt)
 
-    new_events = []
-    for start in event_starts:
-        xevents = sorted(
-            event_starts[start], key=lambda x: (x.programPrimacy, -x.creationTime)
-        )
-        new_events.append(xevents[0])
-
-    # Finally, restitch any events that were split that can be joined back together
-    new_events2 = []
-    for i, evt in enumerate(new_events):
-        if i == 0:
-            new_events2.append(evt)
-            continue
-        prev_evt = new_events[i - 1]
-        if prev_evt.mRID == evt.mRID:
-            evt.intervalStart = prev_evt.intervalStart  # Set to start from prev
-            new_events2.pop()  # Remove the previous
-        new_events2.append(evt)
-    return new_events2
-
-
-def condense_events(events: list[DERControl]) -> dict[str, list[DERModeControl]]:
-    schedule = {}
-    for evt in events:
-        for cntrl in evt.controls:
-            mode = cntrl.mode
-            if mode not in schedule:
-                schedule[mode] = []
-            me = DERModeControl(
-                mRID=evt.mRID,
-                programName=evt.programName,
-                programPrimacy=evt.programPrimacy,
-                currentStatus=evt.currentStatus,
-                statusTime=evt.statusTime,
-                isDefault=evt.isDefault,
-                creationTime=evt.creationTime,
-                intervalStart=evt.intervalStart,
-                intervalDuration=evt.intervalDuration,
-                randomizeStart=evt.randomizeStart,
-                randomizeDuration=evt.randomizeDuration,
-                controlMode=cntrl.mode,
-                controlValue=cntrl.value,
-                controlMultiplier=cntrl.multiplier,
-            )
-            schedule[mode].append(me)
-
-    for mode in schedule:
-        schedule[mode] = condense_mode_events(schedule[mode])
-    return schedule
+def _condense_backend(backend: str) -> Callable[[ModeTimeline], ModeTimeline]:
+    if backend == "python":
+        return condense_timeline
+    if backend == "numpy":
+        from .overlap_numpy import condense_timeline_np  # Optional dependency
+
+        return condense_timeline_np
+    raise ValueError(f"Unknown condense backend: {backend}")
+
+
+@instrumented("event_overlap.condense_mode_events")
+def condense_mode_events(
+    events: list[DERModeControl], backend: str = "python"
+) -> list[DERModeControl]:
+    condense = _condense_backend(backend)
+    timeline = ModeTimeline.from_mode_events(events)
+    return condense(timeline).to_mode_events()
+
+
+@instrumented("event_overlap.condense_events")
+def condense_events(
+    events: list[DERControl], backend: str = "python"
+) -> dict[str, list[DERModeControl]]:
+    condense = _condense_backend(backend)
+    timelines = ModeTimeline.from_events(events)
+    return {
+        mode: condense(timeline).to_mode_events()
+        for mode, timeline in timelines.items()
+    }
@@ -0,0 +1,62 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from .event_models import DERControl, DERModeControl
+from .event_overlap import _condense_backend
+from .timeline import ModeTimeline
+
+
+def _condense_worker(args: tuple[ModeTimeline, str]) -> ModeTimeline:
+    timeline, backend = args
+    return _condense_backend(backend)(timeline)
+
+
+def condense_timelines_parallel(
+    timelines: list[ModeTimeline],
+    max_workers: int | None = None,
+    backend: str = "python",
+) -> list[ModeTimeline]:
+    """Condense independent timelines over a pool of processes.
+
+    Timelines are sent to and from the workers as pickled arrays, which is much
+    more compact than the equivalent pydantic models.
+    """
+    _condense_backend(backend)  # Fail early if not available
+    if not timelines:
+        return []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_condense_worker, [(x, backend) for x in timelines]))
+
+
+def condense_events_parallel(
+    events: list[DERControl],
+    max_workers: int | None = None,
+    backend: str = "python",
+) -> dict[str, list[DERModeControl]]:
+    """Same as condense_events, with each control mode condensed in parallel"""
+    timelines = ModeTimeline.from_events(events)
+    condensed = condense_timelines_parallel(
+        list(timelines.values()), max_workers=max_workers, backend=backend
+    )
+    return {x.mode: x.to_mode_events() for x in condensed}
+
+
+def condense_programs_parallel(
+    program_events: dict[str, list[DERControl]],
+    max_workers: int | None = None,
+    backend: str = "python",
+) -> dict[str, dict[str, list[DERModeControl]]]:
+    """Condense the events of each program, with every (program, mode) in parallel"""
+    keys = []
+    timelines = []
+    for program, events in program_events.items():
+        for mode, timeline in ModeTimeline.from_events(events).items():
+            keys.append((program, mode))
+            timelines.append(timeline)
+    condensed = condense_timelines_parallel(
+        timelines, max_workers=max_workers, backend=backend
+    )
+
+    schedules = {program: {} for program in program_events}
+    for (program, mode), timeline in zip(keys, condensed, strict=True):
+        schedules[program][mode] = timeline.to_mode_events()
+    return schedules
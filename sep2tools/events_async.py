@@ -0,0 +1,151 @@
+import asyncio
+import functools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .event_models import DERControl, DERModeControl
+from .events_db import MEMORY_DB, EventsStore
+
+
+class AsyncEventsStore:
+    """Events store for asyncio, running the blocking sqlite calls in threads.
+
+    Writes go through a single connection one at a time, while reads share a
+    bounded pool of connections so they can run alongside the writes.
+    """
+
+    def __init__(self, name: str = "events.db", readers: int = 4):
+        self.name = name
+        self._writer = EventsStore(name)
+        self._write_pool = ThreadPoolExecutor(1, thread_name_prefix="events-write")
+        self._read_pool = ThreadPoolExecutor(readers, thread_name_prefix="events-read")
+        if name == MEMORY_DB:
+            # Other connections would each get their own empty database
+            self._reader_stores = [self._writer]
+        else:
+            self._reader_stores = [EventsStore(name) for _ in range(readers)]
+        self._readers = queue.SimpleQueue()
+        for store in self._reader_stores:
+            self._readers.put(store)
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    async def __aenter__(self) -> "AsyncEventsStore":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        """Wait for pending calls, then close all connections."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._shutdown)
+
+    def _shutdown(self):
+        self._write_pool.shutdown()
+        self._read_pool.shutdown()
+        self._writer.close()
+        for store in self._reader_stores:
+            store.close()
+
+    def _ensure_schema(self):
+        """Create or migrate the schema on the writer before any reader connects,
+        so the readers don't all try to at once"""
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if not self._schema_ready:
+                self._writer.connect()
+                self._schema_ready = True
+
+    def _read_sync(self, method: str, *args, **kwargs):
+        self._ensure_schema()
+        store = self._readers.get()
+        try:
+            return getattr(store, method)(*args, **kwargs)
+        finally:
+            self._readers.put(store)
+
+    async def _read(self, method: str, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        func = functools.partial(self._read_sync, method, *args, **kwargs)
+        return await loop.run_in_executor(self._read_pool, func)
+
+    async def _write(self, method: str, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        func = functools.partial(getattr(self._writer, method), *args, **kwargs)
+        return await loop.run_in_executor(self._write_pool, func)
+
+    async def add_events(self, events: list[DERControl]):
+        """Add events to the database."""
+        await self._write("add_events", events)
+
+    async def delete_event(self, mrid: str):
+        """Remove an event from the database"""
+        await self._write("delete_event", mrid)
+
+    async def supersede_event(self, mrid: str, control_mode: str):
+        """Update the CurrentStatus to Superseded (4)"""
+        await self._write("supersede_event", mrid, control_mode)
+
+    async def update_default(self, mrid: str, new_status: int, new_duration: int):
+        """Update the status and duration of a default event"""
+        await self._write("update_default", mrid, new_status, new_duration)
+
+    async def cleanup_events(self):
+        """Run all cleanup functions"""
+        await self._write("cleanup_events")
+
+    async def remove_old_events(self, retro_hours: float = 72.0, archive: bool = False):
+        """Delete events that ended more than retro_hours ago, or archive them"""
+        await self._write("remove_old_events", retro_hours, archive)
+
+    async def archive_events(self, retro_hours: float = 72.0) -> int:
+        """Move events that ended more than retro_hours ago into archive tables"""
+        return await self._write("archive_events", retro_hours)
+
+    async def get_programs(self) -> list[str]:
+        """Get list of programs that have events in the database"""
+        return await self._read("get_programs")
+
+    async def get_program_modes(self, program: str) -> list[str]:
+        """Get list of control modes that have events for a given program"""
+        return await self._read("get_program_modes", program)
+
+    async def get_events(
+        self,
+        program: str,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> list[DERControl]:
+        """Get all events for a program, or those overlapping [start, end)"""
+        return await self._read("get_events", program, start, end)
+
+    async def get_mode_events(
+        self,
+        program: str,
+        mode: str,
+        start: int | None = None,
+        end: int | None = None,
+        trusted: bool = False,
+    ) -> list[DERModeControl]:
+        """Get all events for a program and control mode, or those in [start, end)"""
+        return await self._read("get_mode_events", program, mode, start, end, trusted)
+
+    async def get_mode_schedule(
+        self,
+        program: str,
+        mode: str,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> list[DERModeControl]:
+        """Get the condensed schedule for a program and control mode, or the part
+        overlapping [start, end)"""
+        return await self._read("get_mode_schedule", program, mode, start, end)
+
+    async def get_active_control(
+        self, program: str, mode: str, ts: int
+    ) -> DERModeControl | None:
+        """Get the event controlling a program and mode at a timestamp, if any"""
+        return await self._read("get_active_control", program, mode, ts)
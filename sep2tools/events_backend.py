@@ -0,0 +1,94 @@
+from collections.abc import Iterable
+from typing import Any, Protocol, runtime_checkable
+
+from .event_models import DERControl, DERModeControl
+
+
+@runtime_checkable
+class EventsBackend(Protocol):
+    """The events store API the module level ``events_db`` functions call.
+
+    ``EventsStore`` implements it on a single SQLite database, either a file or
+    ``:memory:``, and ``ShardedEventsStore`` on one database per program. Other
+    backends can be used with ``events_db.set_store``.
+    """
+
+    def close(self): ...
+
+    def query(
+        self, sql: str, params: Iterable | None = None
+    ) -> list[dict[str, Any]]: ...
+
+    def execute(self, sql: str, params: Iterable | None = None) -> int: ...
+
+    def vacuum(self): ...
+
+    def add_events(self, events: list[DERControl]): ...
+
+    def delete_event(self, mrid: str): ...
+
+    def supersede_event(self, mrid: str, control_mode: str): ...
+
+    def update_default(self, mrid: str, new_status: int, new_duration: int): ...
+
+    def get_programs(self) -> list[str]: ...
+
+    def get_program_modes(self, program: str) -> list[str]: ...
+
+    def get_events(
+        self,
+        program: str,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> list[DERControl]: ...
+
+    def get_mode_events(
+        self,
+        program: str,
+        mode: str,
+        start: int | None = None,
+        end: int | None = None,
+        trusted: bool = False,
+    ) -> list[DERModeControl]: ...
+
+    def get_mode_event_rows(
+        self,
+        program: str,
+        mode: str,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> list[tuple]: ...
+
+    def get_active_control(
+        self, program: str, mode: str, ts: int
+    ) -> DERModeControl | None: ...
+
+    def get_mode_schedule(
+        self,
+        program: str,
+        mode: str,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> list[DERModeControl]: ...
+
+    def get_archived_events(
+        self,
+        program: str,
+        mode: str | None = None,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> list[DERModeControl]: ...
+
+    def cleanup_defaults(self) -> int: ...
+
+    def supersede_overlapping(self) -> dict[str, int]: ...
+
+    def delete_superseded(self): ...
+
+    def update_status(self): ...
+
+    def cleanup_events(self): ...
+
+    def remove_old_events(self, retro_hours: float = 72.0, archive: bool = False): ...
+
+    def archive_events(self, retro_hours: float = 72.0) -> int: ...
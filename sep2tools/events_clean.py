@@ -1,46 +1,85 @@
+from array import array
+from collections.abc import Iterator
 from datetime import datetime, timedelta
 from typing import Any
 
-from .event_overlap import condense_mode_events
-from .events_db import get_mode_events
-from .times import DEFAULT_TZ, timestamp_local_dt
+from .event_models import DERModeControl
+from .events_db import get_mode_schedule
+from .schedule_cache import clip_schedule
+from .times import DEFAULT_TZ, timestamps_local_dt
 
 
-def get_mode_event_values(
+def _event_value(evt: DERModeControl) -> float:
+    val = evt.controlValue
+    multi = evt.controlMultiplier
+    if multi != 0:
+        val = val * 10**multi
+    return val
+
+
+def iter_mode_event_values(
     program: str,
     mode: str,
     tzinfo=DEFAULT_TZ,
     strip_tz: bool = True,
     retro_hours: float = 24.0,
-) -> list[dict[str, Any]]:
-    events = get_mode_events(program=program, mode=mode)
-    data = []
+) -> Iterator[tuple[datetime, float]]:
+    """Yield the (ts, value) step points for a program mode."""
     min_ts = datetime.now(tzinfo) - timedelta(hours=retro_hours)
+    schedule = get_mode_schedule(program, mode)
+    # Only events still running after min_ts can affect the values returned,
+    # apart from the value of the one before them and a lone default
+    clean_events = schedule
+    if len(schedule) > 1:
+        clean_events = clip_schedule(schedule, int(min_ts.timestamp()), None)
+    num_before = len(schedule) - len(clean_events)
     if strip_tz:
         min_ts = min_ts.replace(tzinfo=None)
-    prev_val = None
-    clean_events = condense_mode_events(events)
-    num_events = len(clean_events)
+    prev_val = _event_value(schedule[num_before - 1]) if num_before else None
+    starts = [evt.intervalStart for evt in clean_events]
+    start_dts = timestamps_local_dt(starts, tzinfo=tzinfo, strip_tz=strip_tz)
+    prev_ends = timestamps_local_dt(
+        [x - 1 for x in starts], tzinfo=tzinfo, strip_tz=strip_tz
+    )
     for i, evt in enumerate(clean_events):
-        start = evt.intervalStart
-        start_dt = timestamp_local_dt(start, tzinfo=tzinfo)
-        if strip_tz:
-            start_dt = start_dt.replace(tzinfo=None)
-        val = evt.controlValue
-        multi = evt.controlMultiplier
-        if multi != 0:
-            val = val * 10**multi
-        if i != 0:
-            prev_end = timestamp_local_dt(start - 1, tzinfo=tzinfo)
-            if strip_tz:
-                prev_end = prev_end.replace(tzinfo=None)
+        start_dt = start_dts[i]
+        val = _event_value(evt)
+        if prev_val is not None:
+            prev_end = prev_ends[i]
             if prev_end > min_ts:
-                data.append({"ts": prev_end, "value": prev_val})
+                yield prev_end, prev_val
         if start_dt > min_ts:
-            data.append({"ts": start_dt, "value": val})
-        if i == 0 and num_events == 1:
+            yield start_dt, val
+        if len(schedule) == 1:
             # Only the default event, so add in a short event
-            data.append({"ts": start_dt, "value": val})
-            data.append({"ts": start_dt + timedelta(seconds=60), "value": val})
+            yield start_dt, val
+            yield start_dt + timedelta(seconds=60), val
         prev_val = val
-    return data
+
+
+def get_mode_event_columns(
+    program: str,
+    mode: str,
+    tzinfo=DEFAULT_TZ,
+    strip_tz: bool = True,
+    retro_hours: float = 24.0,
+) -> dict[str, Any]:
+    """Get the step points for a program mode as parallel ts/value columns."""
+    ts = []
+    values = array("d")
+    points = iter_mode_event_values(program, mode, tzinfo, strip_tz, retro_hours)
+    for point_ts, value in points:
+        ts.append(point_ts)
+        values.append(value)
+    return {"ts": ts, "value": values}
+
+
+def get_mode_event_values(
+    program: str,
+    mode: str,
+    tzinfo=DEFAULT_TZ,
+    strip_tz: bool = True,
+    retro_hours: float = 24.0,
+) -> list[dict[str, Any]]:
+    points = iter_mode_event_values(program, mode, tzinfo, strip_tz, retro_hours)
+    return [{"ts": ts, "value": value} for ts, value in points]
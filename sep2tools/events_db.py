@@ -1,23 +1,52 @@
+import json
 import logging
 import os
-from collections.abc import Iterable
+import sqlite3
+import threading
+from collections import namedtuple
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
 from typing import Any
 
 from dotenv import load_dotenv
 from sqlite_utils import Database
 
-from .event_models import DERControl, DERControlBase, DERModeControl
+from .event_models import (
+    MODE_EVENT_LIST,
+    DERControl,
+    DERControlBase,
+    DERModeControl,
+)
+from .event_overlap import condense_mode_events
+from .events_backend import EventsBackend
+from .instrumentation import instrumented, instrumented_sql
+from .schedule_cache import ScheduleCache, clip_schedule, splice_schedule
 from .times import current_timestamp
 
 load_dotenv()
 log = logging.getLogger(__name__)
 events_dir = os.getenv("SEP2_EVENTS_DIR", "")
 EVENTS_DB_DIR = Path(events_dir)
+# Database name for a private in-memory store, for tests and simulations
+MEMORY_DB = ":memory:"
+EVENTS_SHARDED = os.getenv("SEP2_EVENTS_SHARDED", "").lower() in ("1", "true", "yes")
 
 
 DEFAULT_DIST_BREAKS = (1500, 5000, 10000)
 
+# WAL lets readers continue while the periodic cleanup is writing
+CONNECTION_PRAGMAS = {
+    "busy_timeout": 5000,  # ms, first so switching to WAL waits for other openers
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    "cache_size": -16000,  # KiB
+}
+
 
 EVENT_COLS = {
     "mRID": str,
@@ -35,6 +64,129 @@ EVENT_COLS = {
     "controlMultiplier": int,
 }
 
+EVENT_SELECT = ", ".join(EVENT_COLS)
+INSERT_EVENT = f"""INSERT OR REPLACE INTO events ({EVENT_SELECT})
+VALUES ({", ".join(f":{x}" for x in EVENT_COLS)})"""
+
+# A database row, for reads that skip building dicts and models
+EventRow = namedtuple("EventRow", EVENT_COLS)
+
+
+# Schema changes applied in order, PRAGMA user_version records how many have run
+MIGRATIONS = (
+    # 1: Composite indexes matched to the hot queries, replacing single columns
+    # that are already a prefix of the primary key or of the new indexes
+    (
+        """CREATE INDEX IF NOT EXISTS idx_events_mode_schedule
+        ON events (programName, controlMode, intervalStart, creationTime,
+        currentStatus)""",
+        """CREATE INDEX IF NOT EXISTS idx_events_program_schedule
+        ON events (programName, intervalStart, creationTime)""",
+        """CREATE INDEX IF NOT EXISTS idx_events_duplicates
+        ON events (programName, controlMode, intervalStart, intervalDuration,
+        creationTime DESC, mRID DESC, currentStatus, isDefault) WHERE isDefault = 0""",
+        """CREATE INDEX IF NOT EXISTS idx_events_status
+        ON events (currentStatus, isDefault, intervalStart, intervalDuration)""",
+        "CREATE INDEX IF NOT EXISTS idx_events_intervalStart ON events (intervalStart)",
+        "DROP INDEX IF EXISTS idx_events_mRID",
+        "DROP INDEX IF EXISTS idx_events_controlMode",
+        "DROP INDEX IF EXISTS idx_events_programName",
+    ),
+    # 2: Event end time, for windowed queries that skip events already finished
+    (
+        """CREATE INDEX IF NOT EXISTS idx_events_mode_end
+        ON events (programName, controlMode, (intervalStart + intervalDuration))""",
+        """CREATE INDEX IF NOT EXISTS idx_events_program_end
+        ON events (programName, (intervalStart + intervalDuration))""",
+    ),
+    # 3: Program events in the order get_events groups their rows by
+    (
+        "DROP INDEX IF EXISTS idx_events_program_schedule",
+        """CREATE INDEX IF NOT EXISTS idx_events_program_schedule
+        ON events (programName, intervalStart, creationTime, mRID, controlMode)""",
+    ),
+    # 4: Incremental auto vacuum, so retention can free pages without rewriting
+    # the whole file. Existing databases need one full vacuum to switch over.
+    ("PRAGMA auto_vacuum = INCREMENTAL", "VACUUM"),
+    # 5: Mode events ordered by mRID after creation, so ties condense the same way
+    # on every read
+    (
+        "DROP INDEX IF EXISTS idx_events_mode_schedule",
+        """CREATE INDEX IF NOT EXISTS idx_events_mode_schedule
+        ON events (programName, controlMode, intervalStart, creationTime, mRID,
+        currentStatus)""",
+    ),
+)
+
+# Completed events are moved to one table per month, by when they ended
+ARCHIVE_PREFIX = "events_archive_"
+
+
+@contextmanager
+def write_transaction(db: Database) -> Iterator[Database]:
+    """Run statements in a transaction that takes the write lock straight away, so
+    connections opening at the same time wait for each other on busy_timeout
+    instead of failing to upgrade a read lock."""
+    db.conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield db
+        db.conn.commit()
+    except BaseException:
+        db.conn.rollback()
+        raise
+
+
+def schema_version(db: Database) -> int:
+    return db.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate_events_table(db: Database) -> int:
+    """Apply any schema migrations the database hasn't had yet."""
+    vacuum = False
+    with write_transaction(db):
+        # Read under the lock, as another connection may have just migrated
+        version = schema_version(db)
+        for i, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            log.info(f"Migrating events database to schema version {i}")
+            for sql in statements:
+                if sql == "VACUUM":
+                    vacuum = True  # Can't run inside a transaction
+                else:
+                    db.execute(sql)
+            db.execute(f"PRAGMA user_version = {i}")
+    if vacuum:
+        db.execute("VACUUM")
+    return len(MIGRATIONS)
+
+
+def create_events_table(db: Database):
+    """Create the events table and indexes if they don't exist."""
+    if schema_version(db) == len(MIGRATIONS):
+        return  # Created and migrated, so there is no need for the write lock
+    with write_transaction(db):
+        db["events"].create(
+            EVENT_COLS,
+            pk=("mRID", "controlMode"),
+            not_null=(
+                "mRID",
+                "controlMode",
+                "creationTime",
+                "currentStatus",
+                "intervalStart",
+            ),
+            if_not_exists=True,
+        )
+    migrate_events_table(db)
+
+
+def create_archive_table(db: Database, name: str):
+    """Create a monthly archive table if it doesn't exist."""
+    table = db[name]
+    table.create(EVENT_COLS, pk=("mRID", "controlMode"), if_not_exists=True)
+    table.create_index(
+        ("programName", "controlMode", "intervalStart"), if_not_exists=True
+    )
+
 
 def create_events_db(name: str = "events.db") -> Path:
     """Create the events database if it doesn't exist."""
@@ -42,57 +194,11 @@ def create_events_db(name: str = "events.db") -> Path:
     if db_path.exists():
         return db_path
     db = Database(db_path, strict=True)
-    events = db["events"]
-    events.create(
-        EVENT_COLS,
-        pk=("mRID", "controlMode"),
-        not_null=(
-            "mRID",
-            "controlMode",
-            "creationTime",
-            "currentStatus",
-            "intervalStart",
-        ),
-        if_not_exists=True,
-    )
-    events.create_index(("mRID",))
-    events.create_index(("controlMode",))
-    events.create_index(("programName",))
-    events.create_index(("intervalStart",))
+    create_events_table(db)
     db.close()
     return db_path
 
 
-def query_events_db(
-    sql: str, params: Iterable | None = None, db_name: str = "events.db"
-) -> list[dict[str, Any]]:
-    """Run a query against the events database and return results as list of dicts."""
-    db_path = create_events_db(db_name)
-    db = Database(db_path)
-    res = list(db.query(sql, params))
-    db.close()
-    return res
-
-
-def execute_events_db(
-    sql: str, params: Iterable | None = None, db_name: str = "events.db"
-):
-    """Run a query against the events database and return results as list of dicts."""
-    db_path = create_events_db(db_name)
-    db = Database(db_path)
-    with db.conn:
-        db.execute(sql, params)
-    db.close()
-
-
-def vaccum_events_db(db_name: str = "events.db"):
-    """Vacuum the events database ."""
-    db_path = create_events_db(db_name)
-    db = Database(db_path)
-    db.vacuum()
-    db.close()
-
-
 def event_to_rows(evt: DERControl) -> list[dict[str, Any]]:
     """Convert an event to a list of rows for the database."""
     rows = []
@@ -137,6 +243,26 @@ def row_to_event(row: dict) -> DERControl:
     )
 
 
+def rows_to_event(rows: list[tuple]) -> DERControl:
+    """Build an event from its rows of EVENT_SELECT, one per control mode"""
+    row = dict(zip(EVENT_COLS, rows[0], strict=True))
+    return DERControl(
+        mRID=row["mRID"],
+        programName=row["programName"],
+        programPrimacy=row["programPrimacy"],
+        creationTime=row["creationTime"],
+        currentStatus=row["currentStatus"],
+        isDefault=row["isDefault"],
+        intervalStart=row["intervalStart"],
+        intervalDuration=row["intervalDuration"],
+        randomizeStart=row["randomizeStart"],
+        randomizeDuration=row["randomizeDuration"],
+        controls=[
+            DERControlBase(mode=x[10], value=x[11], multiplier=x[12]) for x in rows
+        ],
+    )
+
+
 def row_to_mode_event(row: dict) -> DERModeControl:
     return DERModeControl(
         mRID=row["mRID"],
@@ -155,229 +281,706 @@ def row_to_mode_event(row: dict) -> DERModeControl:
     )
 
 
+def _event_row(cursor: sqlite3.Cursor, row: tuple) -> EventRow:
+    return EventRow._make(row)
+
+
+@instrumented("events_db.rows_to_mode_events_trusted")
+def rows_to_mode_events_trusted(rows: list[tuple]) -> list[DERModeControl]:
+    """Build mode events from rows of EVENT_SELECT, validating them in one call"""
+    return MODE_EVENT_LIST.validate_python(
+        [dict(zip(EVENT_COLS, x, strict=True)) for x in rows]
+    )
+
+
+@instrumented("events_db.rows_to_mode_events")
+def rows_to_mode_events(rows: list[dict]) -> list[DERModeControl]:
+    events = []
+    for x in rows:
+        item = row_to_mode_event(x)
+        if item.currentStatus in (2, 3, 4):
+            continue  # Skip cancelled or superseded
+        events.append(item)
+    return events
+
+
+def window_filter(start: int | None, end: int | None) -> str:
+    """SQL conditions for events overlapping the [:start, :end) window."""
+    sql = ""
+    if start is not None:
+        sql += "AND (intervalStart + intervalDuration) > :start "
+    if end is not None:
+        sql += "AND intervalStart < :end "
+    return sql
+
+
+# Events that can be removed once they ended before :cutoff
+RETENTION_FILTER = """currentStatus NOT IN (0,1)
+AND (intervalStart + intervalDuration) < :cutoff"""
+
+
+def retention_cutoff(retro_hours: float) -> int:
+    return int(current_timestamp() - retro_hours * 3600)
+
+
+def _mode_events_sql(start: int | None, end: int | None) -> str:
+    return f"""SELECT {EVENT_SELECT} FROM events
+    WHERE programName = :prg AND controlMode = :mode
+    AND currentStatus IN (0,1,999)
+    {window_filter(start, end)}
+    ORDER BY intervalStart, creationTime, mRID
+    """
+
+
+class EventsStore:
+    """Events database that keeps a single connection open between calls.
+
+    Condensed schedules read through the store are cached, and only the time
+    ranges touched by later writes are recondensed on the next read.
+    A store named ``:memory:`` keeps its events in memory until it is closed.
+    """
+
+    def __init__(self, name: str = "events.db"):
+        self.name = name
+        self.db_path = MEMORY_DB if name == MEMORY_DB else EVENTS_DB_DIR / name
+        self._db: Database | None = None
+        self._lock = threading.RLock()
+        self._in_transaction = False
+        self._schedules = ScheduleCache()
+        self._data_version = None
+
+    def __enter__(self) -> "EventsStore":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def db(self) -> Database:
+        """The open database, connecting and creating the schema on first use."""
+        with self._lock:
+            if self._db is None:
+                self.connect()
+            return self._db
+
+    def connect(self):
+        """Open the database if it isn't already, creating or migrating the schema."""
+        with self._lock:
+            if self._db is not None:
+                return
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            for pragma, value in CONNECTION_PRAGMAS.items():
+                conn.execute(f"PRAGMA {pragma} = {value}")
+            db = Database(conn, strict=True)
+            create_events_table(db)
+            self._db = db
+
+    def close(self):
+        """Close the connection, it will be reopened if the store is used again."""
+        with self._lock:
+            if self._db is not None:
+                self._db.execute("PRAGMA optimize")
+                self._db.close()
+                self._db = None
+
+    @contextmanager
+    def transaction(self) -> Iterator[Database]:
+        """Run statements in a single transaction, nested calls join the outer one."""
+        with self._lock:
+            if self._in_transaction:
+                yield self.db
+                return
+            conn = self.db.conn
+            conn.execute("BEGIN")
+            self._in_transaction = True
+            try:
+                yield self.db
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                # Schedules cached during the transaction may have rolled back data
+                self._schedules.clear()
+                raise
+            finally:
+                self._in_transaction = False
+
+    @instrumented_sql
+    def query(self, sql: str, params: Iterable | None = None) -> list[dict[str, Any]]:
+        """Run a query and return results as list of dicts."""
+        with self._lock:
+            return list(self.db.query(sql, params))
+
+    def execute(self, sql: str, params: Iterable | None = None) -> int:
+        """Run a statement and return the number of rows changed."""
+        with self._lock:
+            self._schedules.clear()  # Could have changed any schedule
+            return self._execute(sql, params)
+
+    @instrumented_sql
+    def query_rows(
+        self,
+        sql: str,
+        params: Iterable | None = None,
+        row_factory: Callable | None = None,
+    ) -> list[tuple]:
+        """Run a query and return the rows as tuples, skipping any dicts."""
+        with self._lock:
+            cursor = self.db.conn.cursor()
+            cursor.row_factory = row_factory
+            return cursor.execute(sql, params or ()).fetchall()
+
+    @instrumented_sql
+    def _execute(self, sql: str, params: Iterable | None = None) -> int:
+        with self.transaction() as db:
+            rowcount = db.execute(sql, params).rowcount
+            if rowcount < 0:
+                # sqlite3 doesn't count the rows of statements starting with WITH
+                rowcount = db.execute("SELECT changes()").fetchone()[0]
+            return rowcount
+
+    @instrumented_sql
+    def _execute_many(self, sql: str, params: Iterable) -> int:
+        with self.transaction() as db:
+            return db.conn.executemany(sql, params).rowcount
+
+    def _mark_changed(self, where: str, params: dict[str, Any]):
+        """Mark the time ranges of matching rows as changed in cached schedules"""
+        if not self._schedules:
+            return
+        sql = "SELECT programName, controlMode, intervalStart, intervalDuration "
+        sql += f"FROM events WHERE {where}"
+        for x in self.query(sql, params):
+            key = (x["programName"], x["controlMode"])
+            start = x["intervalStart"]
+            self._schedules.mark_changed(key, start, start + x["intervalDuration"])
+
+    def vacuum(self):
+        """Vacuum the events database."""
+        with self._lock:
+            self.db.vacuum()
+
+    def incremental_vacuum(self, pages: int | None = None) -> int:
+        """Return free pages to the file system without rewriting the database,
+        returning how many pages are still free."""
+        pragma = "PRAGMA incremental_vacuum"
+        if pages is not None:
+            pragma += f"({int(pages)})"
+        with self._lock:
+            if self._in_transaction:
+                raise RuntimeError("Can't vacuum inside a transaction")
+            # Each step frees a page, but execute only steps statements without
+            # results once, so run it as a script
+            self.db.conn.executescript(pragma)
+            return self.db.execute("PRAGMA freelist_count").fetchone()[0]
+
+    @instrumented("events_db.add_events")
+    def add_events(self, events: list[DERControl]):
+        """Add events to the database."""
+        records = []
+        for evt in events:
+            records.extend(event_to_rows(evt))
+        with self._lock:
+            # Replaced events may have moved, so their old times change too
+            mrids = json.dumps([evt.mRID for evt in events])
+            self._mark_changed(
+                "mRID IN (SELECT value FROM json_each(:mrids))", {"mrids": mrids}
+            )
+            self._execute_many(INSERT_EVENT, records)
+            for x in records:
+                key = (x["programName"], x["controlMode"])
+                start = x["intervalStart"]
+                self._schedules.mark_changed(key, start, start + x["intervalDuration"])
+
+    def delete_event(self, mrid: str):
+        """Remove an event from the database"""
+        sql = "DELETE FROM events WHERE mRID = :mrid"
+        params = {"mrid": mrid}
+        with self._lock:
+            self._mark_changed("mRID = :mrid", params)
+            self._execute(sql, params)
+
+    def supersede_event(self, mrid: str, control_mode: str):
+        """Update the CurrentStatus to Superseded (4)"""
+        sql = "UPDATE events SET currentStatus = 4 "
+        sql += "WHERE mRID = :mrid AND controlMode = :mode"
+        params = {"mrid": mrid, "mode": control_mode}
+        with self._lock:
+            self._mark_changed("mRID = :mrid AND controlMode = :mode", params)
+            self._execute(sql, params)
+
+    def get_programs(self) -> list[str]:
+        """Get list of programs that have events in the database"""
+        sql = "SELECT DISTINCT programName FROM events"
+        return [x["programName"] for x in self.query(sql)]
+
+    def get_program_modes(self, program: str) -> list[str]:
+        """Get list of control modes that have events for a given program"""
+        sql = "SELECT DISTINCT controlMode FROM events WHERE programName = :prg"
+        return [x["controlMode"] for x in self.query(sql, {"prg": program})]
+
+    @instrumented("events_db.get_events")
+    def get_events(
+        self,
+        program: str,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> list[DERControl]:
+        """Get all events for a program, or those overlapping [start, end).
+        To read rows without building or validating models, use
+        get_mode_event_rows for each mode."""
+        # The rows of each event are adjacent, as they share a start and creation
+        sql = f"""SELECT {EVENT_SELECT} FROM events
+        WHERE programName = :prg
+        AND currentStatus NOT IN (2,3,4)
+        {window_filter(start, end)}
+        ORDER BY intervalStart, creationTime, mRID, controlMode
+        """
+        params = {"prg": program, "start": start, "end": end}
+        rows = self.query_rows(sql, params)
+        return [rows_to_event(list(x)) for _, x in groupby(rows, itemgetter(0))]
+
+    @instrumented("events_db.get_mode_events")
+    def get_mode_events(
+        self,
+        program: str,
+        mode: str,
+        start: int | None = None,
+        end: int | None = None,
+        trusted: bool = False,
+    ) -> list[DERModeControl]:
+        """Get all events for a program and control mode, or those in [start, end).
+        Trusted reads validate all the events in one call, which is faster. To
+        skip validation altogether, use get_mode_event_rows."""
+        sql = _mode_events_sql(start, end)
+        params = {"prg": program, "mode": mode, "start": start, "end": end}
+        if trusted:
+            return rows_to_mode_events_trusted(self.query_rows(sql, params))
+        return rows_to_mode_events(self.query(sql, params))
+
+    def get_mode_event_rows(
+        self,
+        program: str,
+        mode: str,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> list[EventRow]:
+        """Get the rows for get_mode_events as named tuples, without any models"""
+        sql = _mode_events_sql(start, end)
+        params = {"prg": program, "mode": mode, "start": start, "end": end}
+        return self.query_rows(sql, params, _event_row)
+
+    @instrumented("events_db.get_active_control")
+    def get_active_control(
+        self, program: str, mode: str, ts: int
+    ) -> DERModeControl | None:
+        """Get the event controlling a program and mode at a timestamp, if any.
+        This is the same event condensing the stored events would pick, as both
+        break ties by start and then mRID, with its full interval.
+        The lookup is not O(log n): it range scans idx_events_mode_end over every
+        event ending after ts, including all future events and long defaults, and
+        sorts them in a temp b-tree. For repeated lookups, build an
+        ActiveControlIndex over get_mode_schedule instead."""
+        sql = """SELECT * FROM events
+        WHERE programName = :prg AND controlMode = :mode
+        AND currentStatus IN (0,1,999)
+        AND intervalStart <= :ts AND (intervalStart + intervalDuration) > :ts
+        ORDER BY programPrimacy, creationTime DESC, intervalStart, mRID
+        LIMIT 1
+        """
+        res = self.query(sql, {"prg": program, "mode": mode, "ts": ts})
+        return row_to_mode_event(res[0]) if res else None
+
+    def update_default(self, mrid: str, new_status: int, new_duration: int):
+        """Update the status and duration of a default event"""
+        sql = "UPDATE events SET currentStatus = :status, intervalDuration = :duration "
+        sql += "WHERE mRID = :mrid"
+        params = {"mrid": mrid, "status": new_status, "duration": new_duration}
+        with self._lock:
+            self._mark_changed("mRID = :mrid", params)
+            self._execute(sql, params)
+            self._mark_changed("mRID = :mrid", params)
+
+    @instrumented("events_db.get_mode_schedule")
+    def get_mode_schedule(
+        self,
+        program: str,
+        mode: str,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> list[DERModeControl]:
+        """Get the condensed schedule for a program and control mode, or the part
+        overlapping [start, end). The events returned are shared with the cache
+        and should not be modified."""
+        key = (program, mode)
+        with self._lock:
+            # Another connection committing means any cached schedule may be stale
+            data_version = self.db.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version:
+                self._schedules.clear()
+                self._data_version = data_version
+
+            schedule = self._schedules.get(key)
+            if schedule is None:
+                events = self.get_mode_events(program, mode, trusted=True)
+                schedule = condense_mode_events(events)
+            for change_start, change_end in self._schedules.pop_changes(key):
+                events = self.get_mode_events(
+                    program, mode, change_start, change_end, trusted=True
+                )
+                patch = condense_mode_events(events)
+                schedule = splice_schedule(schedule, change_start, change_end, patch)
+            self._schedules.set(key, schedule)
+        return clip_schedule(schedule, start, end)
+
+    def cleanup_defaults(self) -> int:
+        """If a default has been superseded, update the old events"""
+        log.info("Cleaning up default events")
+        # Each old default is completed one second before the next newer one starts
+        sql = """
+        WITH defaults AS (
+        SELECT DISTINCT programName, mRID, intervalStart
+        FROM events
+        WHERE intervalDuration = 999999999 AND currentStatus = 1
+        ), replaced AS (
+        SELECT mRID, intervalStart, lag(intervalStart) OVER (
+            PARTITION BY programName ORDER BY intervalStart DESC
+        ) AS nextStart
+        FROM defaults
+        )
+        UPDATE events SET currentStatus = 999, intervalDuration = (
+            SELECT replaced.nextStart - 1 - replaced.intervalStart FROM replaced
+            WHERE replaced.mRID = events.mRID
+        )
+        WHERE mRID IN (SELECT mRID FROM replaced WHERE nextStart IS NOT NULL)
+        """
+        return self.execute(sql)
+
+    def supersede_overlapping(self) -> dict[str, int]:
+        """Check for events with duplicate control events for same interval"""
+        log.info("Superseding overlapping events")
+        # Keep the most recent event of each duplicate group and supersede the rest
+        sql = """
+        WITH ranked AS (
+        SELECT mRID, controlMode, row_number() OVER (
+            PARTITION BY programName, controlMode, intervalStart, intervalDuration
+            ORDER BY creationTime DESC, mRID DESC
+        ) AS num
+        FROM events
+        WHERE isDefault = 0
+        AND currentStatus IN (0,1,999)
+        )
+        UPDATE events SET currentStatus = 4
+        WHERE (mRID, controlMode) IN (
+            SELECT mRID, controlMode FROM ranked WHERE num > 1
+        )
+        RETURNING programName, controlMode, intervalStart, intervalDuration
+        """
+        with self.transaction():
+            res = self.query_rows(sql)
+            self._schedules.clear()
+        stats = {"groups": len(set(res)), "superseded": len(res)}
+        log.info(f"Superseded {stats['superseded']} events due to overlap")
+        return stats
+
+    def delete_superseded(self):
+        """Delete events that have been superseded or cancelled"""
+        log.info("Deleting superseded events")
+        sql = """
+        DELETE FROM events
+        WHERE isDefault = 0
+        AND currentStatus IN (2,3,4)
+        """
+        self.execute(sql)
+
+    def update_status(self):
+        """Update status of events based on current time"""
+
+        # Set all events with start + duration in the past to Completed (999)
+        sql_completed = """UPDATE events
+        SET currentStatus = 999
+        WHERE isDefault = 0
+        AND currentStatus IN (0,1)
+        AND (intervalStart + intervalDuration) < strftime('%s', 'now')
+        """
+        self.execute(sql_completed)
+
+        # Set all events that have started but not yet completed to Active (1)
+        sql_active = """UPDATE events
+        SET currentStatus = 1
+        WHERE isDefault = 0
+        AND currentStatus = 0
+        AND intervalStart <= strftime('%s', 'now')
+        AND (intervalStart + intervalDuration) > strftime('%s', 'now')
+        """
+        self.execute(sql_active)
+
+    @instrumented("events_db.cleanup_events")
+    def cleanup_events(self):
+        """Run all cleanup functions as a single transaction"""
+        with self.transaction():
+            self.cleanup_defaults()
+            self.supersede_overlapping()
+            self.delete_superseded()
+            self.update_status()
+
+    @instrumented("events_db.remove_old_events")
+    def remove_old_events(self, retro_hours: float = 72.0, archive: bool = False):
+        """Delete events that ended more than retro_hours ago, or move them to
+        the monthly archive tables"""
+
+        self.cleanup_events()  # Run a cleanup first
+
+        if archive:
+            self.archive_events(retro_hours, cleanup=False)
+        else:
+            sql = f"DELETE FROM events WHERE {RETENTION_FILTER}"
+            self.execute(sql, {"cutoff": retention_cutoff(retro_hours)})
+
+        self.incremental_vacuum()
+
+    @instrumented("events_db.archive_events")
+    def archive_events(self, retro_hours: float = 72.0, cleanup: bool = True) -> int:
+        """Move events that ended more than retro_hours ago into monthly archive
+        tables, returning the number of rows moved"""
+        if cleanup:
+            self.cleanup_events()
+        params = {"cutoff": retention_cutoff(retro_hours)}
+        month = "strftime('%Y%m', intervalStart + intervalDuration, 'unixepoch')"
+        with self._lock, self.transaction() as db:
+            sql = f"SELECT DISTINCT {month} FROM events WHERE {RETENTION_FILTER}"
+            months = [x[0] for x in self.query_rows(sql, params)]
+            for x in months:
+                table = f"{ARCHIVE_PREFIX}{x}"
+                create_archive_table(db, table)
+                sql = f"""INSERT OR REPLACE INTO {table} ({EVENT_SELECT})
+                SELECT {EVENT_SELECT} FROM events
+                WHERE {RETENTION_FILTER} AND {month} = :month"""
+                self._execute(sql, {**params, "month": x})
+            sql = f"DELETE FROM events WHERE {RETENTION_FILTER}"
+            moved = self._execute(sql, params)
+            self._schedules.clear()  # Completed events are part of schedules
+        return moved
+
+    def get_archive_tables(self) -> list[str]:
+        """Get the archive tables, oldest first"""
+        names = self.db.table_names()
+        return sorted(x for x in names if x.startswith(ARCHIVE_PREFIX))
+
+    @instrumented("events_db.get_archived_events")
+    def get_archived_events(
+        self,
+        program: str,
+        mode: str | None = None,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> list[DERModeControl]:
+        """Get archived events for a program, and optionally a control mode,
+        that overlapped [start, end). Includes cancelled and superseded events."""
+        tables = self.get_archive_tables()
+        if start is not None:
+            # Tables are by end month, so earlier ones ended before the window
+            first = f"{ARCHIVE_PREFIX}{datetime.fromtimestamp(start, UTC):%Y%m}"
+            tables = [x for x in tables if x >= first]
+        if not tables:
+            return []
+        where = "WHERE programName = :prg "
+        if mode is not None:
+            where += "AND controlMode = :mode "
+        where += window_filter(start, end)
+        sql = " UNION ALL ".join(
+            f"SELECT {EVENT_SELECT} FROM {x} {where}" for x in tables
+        )
+        sql += " ORDER BY intervalStart, creationTime, mRID, controlMode"
+        params = {"prg": program, "mode": mode, "start": start, "end": end}
+        return rows_to_mode_events_trusted(self.query_rows(sql, params))
+
+
+_stores: dict[tuple[str, bool], EventsBackend] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(db_name: str = "events.db", sharded: bool | None = None) -> EventsBackend:
+    """Get the shared store for a database, so connections are reused.
+    Sharded stores keep each program in its own database file, and are used by
+    default when SEP2_EVENTS_SHARDED is set."""
+    if sharded is None:
+        sharded = EVENTS_SHARDED and db_name != MEMORY_DB
+    with _stores_lock:
+        store = _stores.get((db_name, sharded))
+        if store is None:
+            if sharded:
+                from .events_sharded import ShardedEventsStore
+
+                store = ShardedEventsStore(db_name)
+            else:
+                store = EventsStore(db_name)
+            _stores[(db_name, sharded)] = store
+        return store
+
+
+def set_store(store: EventsBackend, db_name: str = "events.db"):
+    """Use another backend for a database name, closing any store it replaces."""
+    with _stores_lock:
+        for sharded in (False, True):
+            old = _stores.pop((db_name, sharded), None)
+            if old is not None and old is not store:
+                old.close()
+            _stores[(db_name, sharded)] = store
+
+
+def close_stores():
+    """Close all shared store connections."""
+    with _stores_lock:
+        for store in _stores.values():
+            store.close()
+        _stores.clear()
+
+
+def query_events_db(
+    sql: str, params: Iterable | None = None, db_name: str = "events.db"
+) -> list[dict[str, Any]]:
+    """Run a query against the events database and return results as list of dicts."""
+    return get_store(db_name).query(sql, params)
+
+
+def execute_events_db(
+    sql: str, params: Iterable | None = None, db_name: str = "events.db"
+):
+    """Run a query against the events database and return results as list of dicts."""
+    get_store(db_name).execute(sql, params)
+
+
+def vaccum_events_db(db_name: str = "events.db"):
+    """Vacuum the events database ."""
+    get_store(db_name).vacuum()
+
+
 def add_events(events: list[DERControl], db_name: str = "events.db"):
     """Add events to the database."""
-    records = []
-    for evt in events:
-        records.extend(event_to_rows(evt))
-
-    db_path = create_events_db(db_name)
-    db = Database(db_path)
-    db["events"].insert_all(records, replace=True)
-    db.close()
+    get_store(db_name).add_events(events)
 
 
 def delete_event(mrid: str, db_name: str = "events.db"):
     """Remove an event from the database"""
-    sql = "DELETE FROM events WHERE mRID = :mrid"
-    execute_events_db(sql, {"mrid": mrid}, db_name=db_name)
+    get_store(db_name).delete_event(mrid)
 
 
 def supersede_event(mrid: str, control_mode: str, db_name: str = "events.db"):
     """Update the CurrentStatus to Superseded (4)"""
-    sql = (
-        "UPDATE events SET currentStatus = 4 WHERE mRID = :mrid AND controlMode = :mode"
-    )
-    # Update the CurrentStatus to 4 (Superseded)
-    execute_events_db(sql, {"mrid": mrid, "mode": control_mode}, db_name=db_name)
+    get_store(db_name).supersede_event(mrid, control_mode)
 
 
 def get_programs(db_name: str = "events.db") -> list[str]:
     """Get list of programs that have events in the database"""
-    sql = "SELECT DISTINCT programName FROM events"
-    return [x["programName"] for x in query_events_db(sql, db_name=db_name)]
+    return get_store(db_name).get_programs()
 
 
 def get_program_modes(program: str, db_name: str = "events.db") -> list[str]:
     """Get list of control modes that have events for a given program"""
-    sql = "SELECT DISTINCT controlMode FROM events WHERE programName = :prg"
-    return [
-        x["controlMode"]
-        for x in query_events_db(sql, {"prg": program}, db_name=db_name)
-    ]
-
-
-def get_events(program: str, db_name: str = "events.db") -> list[DERControl]:
-    """Get all events for a program"""
-    sql = """SELECT * FROM events
-    WHERE programName = :prg 
-    ORDER BY intervalStart, creationTime
-    """
-    events = {}
-    res = query_events_db(sql, {"prg": program}, db_name=db_name)
-    for x in res:
-        item = row_to_event(x)
-        if item.currentStatus in (2, 3, 4):
-            continue  # Skip cancelled or superseded
-        mrid = item.mRID
-        if mrid not in events:
-            events[mrid] = item
-        else:
-            events[mrid].controls.append(item.controls)
-    return list(events.values())
+    return get_store(db_name).get_program_modes(program)
+
+
+def get_events(
+    program: str,
+    db_name: str = "events.db",
+    start: int | None = None,
+    end: int | None = None,
+) -> list[DERControl]:
+    """Get all events for a program, or those overlapping [start, end)"""
+    return get_store(db_name).get_events(program, start, end)
 
 
 def get_mode_events(
-    program: str, mode: str, db_name: str = "events.db"
+    program: str,
+    mode: str,
+    db_name: str = "events.db",
+    start: int | None = None,
+    end: int | None = None,
+    trusted: bool = False,
 ) -> list[DERModeControl]:
-    """Get all events for a program and control mode"""
-    sql = """SELECT * FROM events
-    WHERE programName = :prg AND controlMode = :mode
-    AND currentStatus IN (0,1,999)
-    ORDER BY intervalStart, creationTime
-    """
-    res = query_events_db(sql, {"prg": program, "mode": mode}, db_name=db_name)
-    events = []
-    for x in res:
-        item = row_to_mode_event(x)
-        if item.currentStatus in (2, 3, 4):
-            continue  # Skip cancelled or superseded
-        events.append(item)
-    return events
+    """Get all events for a program and control mode, or those in [start, end)"""
+    return get_store(db_name).get_mode_events(program, mode, start, end, trusted)
+
+
+def get_mode_event_rows(
+    program: str,
+    mode: str,
+    db_name: str = "events.db",
+    start: int | None = None,
+    end: int | None = None,
+) -> list[EventRow]:
+    """Get the rows for a program and control mode as named tuples"""
+    return get_store(db_name).get_mode_event_rows(program, mode, start, end)
+
+
+def get_mode_schedule(
+    program: str,
+    mode: str,
+    db_name: str = "events.db",
+    start: int | None = None,
+    end: int | None = None,
+) -> list[DERModeControl]:
+    """Get the condensed schedule for a program and control mode"""
+    return get_store(db_name).get_mode_schedule(program, mode, start=start, end=end)
+
+
+def get_active_control(
+    program: str, mode: str, ts: int, db_name: str = "events.db"
+) -> DERModeControl | None:
+    """Get the event controlling a program and mode at a timestamp, if any"""
+    return get_store(db_name).get_active_control(program, mode, ts)
 
 
 def update_default(
     mrid: str, new_status: int, new_duration: int, db_name: str = "events.db"
 ):
     """Update the status and duration of a default event"""
-    sql = "UPDATE events SET currentStatus = :status, intervalDuration = :duration "
-    sql += "WHERE mRID = :mrid"
-    execute_events_db(
-        sql,
-        {"mrid": mrid, "status": new_status, "duration": new_duration},
-        db_name=db_name,
-    )
+    get_store(db_name).update_default(mrid, new_status, new_duration)
 
 
-def cleanup_defaults(db_name: str = "events.db"):
+def cleanup_defaults(db_name: str = "events.db") -> int:
     """If a default has been superseded, update the old events"""
-    log.info("Cleaning up default events")
-    sql = """SELECT DISTINCT programName, mRID, intervalStart
-    FROM events 
-    WHERE intervalDuration = 999999999 AND currentStatus = 1
-    ORDER BY programName, intervalStart DESC
-    """
-    programs = {}
-    res = query_events_db(sql, db_name=db_name)
-    for x in res:
-        program = x["programName"]
-        start = x["intervalStart"]
-        if program not in programs:
-            programs[program] = start
-            continue  # This one is active
-
-        # This one is old - change status and duration
-        mrid = x["mRID"]
-        end = programs[program] - 1
-        new_duration = end - start
-        new_status = 999  # Completed
-        update_default(mrid, new_status, new_duration, db_name=db_name)
-
-        # Update the start in case there are even older defaults
-        programs[program] = start
-
-
-def supersede_overlapping(db_name: str = "events.db"):
+    return get_store(db_name).cleanup_defaults()
+
+
+def supersede_overlapping(db_name: str = "events.db") -> dict[str, int]:
     """Check for events with duplicate control events for same interval"""
-    log.info("Superseding overlapping events")
-    sql_dup = """
-    WITH overlaps AS (
-    SELECT programName, controlMode, intervalStart, intervalDuration, 
-        count(*) as num_events
-    FROM events
-    WHERE isDefault = 0
-    AND currentStatus IN (0,1,999)
-    GROUP BY programName, controlMode, intervalStart, intervalDuration
-    )
-    SELECT * FROM overlaps
-    WHERE num_events > 1
-    ORDER BY num_events DESC
-    """
-    sql_matches = """SELECT * FROM events
-    WHERE programName = :prg AND controlMode = :mode 
-    AND intervalStart = :start AND intervalDuration = :duration
-    ORDER BY creationTime DESC
-    """
-    to_supersede = []
-    res = query_events_db(sql_dup, db_name=db_name)
-    for x in res:
-        program = x["programName"]
-        mode = x["controlMode"]
-        start = x["intervalStart"]
-        duration = x["intervalDuration"]
-        num_events = x["num_events"]
-        if num_events <= 1:
-            continue  # No duplicates, move on
-
-        int_res = query_events_db(
-            sql_matches,
-            {"prg": program, "mode": mode, "start": start, "duration": duration},
-            db_name=db_name,
-        )
-        # Ignore the first result (most recent) and supersede the rest
-        for y in int_res[1:]:
-            mrid = y["mRID"]
-            mode = y["controlMode"]
-            to_supersede.append((mrid, mode))
-    log.info(f"Found {len(to_supersede)} events to supersede due to overlap")
-    for mrid, mode in to_supersede:
-        supersede_event(mrid, mode, db_name=db_name)
+    return get_store(db_name).supersede_overlapping()
 
 
 def delete_superseded(db_name: str = "events.db"):
     """Delete events that have been superseded or cancelled"""
-    log.info("Deleting superseded events")
-    sql = """
-    SELECT * FROM events
-    WHERE isDefault = 0
-    AND currentStatus IN (2,3,4)
-    """
-    execute_events_db(sql, db_name=db_name)
+    get_store(db_name).delete_superseded()
 
 
 def update_status(db_name: str = "events.db"):
     """Update status of events based on current time"""
-
-    # Set all events with start + duration in the past to Completed (999)
-    sql_completed = """UPDATE events
-    SET currentStatus = 999
-    WHERE isDefault = 0
-    AND currentStatus IN (0,1)
-    AND (intervalStart + intervalDuration) < strftime('%s', 'now')
-    """
-    execute_events_db(sql_completed, db_name=db_name)
-
-    # Set all events that have started but not yet completed to Active (1)
-    sql_active = """UPDATE events
-    SET currentStatus = 1
-    WHERE isDefault = 0
-    AND currentStatus = 0
-    AND intervalStart <= strftime('%s', 'now')
-    AND (intervalStart + intervalDuration) > strftime('%s', 'now')
-    """
-    execute_events_db(sql_active, db_name=db_name)
+    get_store(db_name).update_status()
 
 
 def cleanup_events(db_name: str = "events.db"):
     """Run all cleanup functions"""
-    create_events_db(name=db_name)
-    cleanup_defaults(db_name=db_name)
-    supersede_overlapping(db_name=db_name)
-    delete_superseded(db_name=db_name)
-    update_status(db_name=db_name)
+    get_store(db_name).cleanup_events()
 
 
-def remove_old_events(retro_hours: float = 72.0, db_name: str = "events.db"):
-    """Delete events that ended more than retro_hours ago"""
+def remove_old_events(
+    retro_hours: float = 72.0, db_name: str = "events.db", archive: bool = False
+):
+    """Delete events that ended more than retro_hours ago, or archive them"""
+    get_store(db_name).remove_old_events(retro_hours, archive)
 
-    cleanup_events(db_name=db_name)  # Run a cleanup first
 
-    sql = """DELETE FROM events
-    WHERE currentStatus NOT IN (0,1)
-    AND (intervalStart + intervalDuration) < :cutoff
-    """
-    now = current_timestamp()
-    cutoff_time = int(now - retro_hours * 3600)
-    execute_events_db(sql, {"cutoff": cutoff_time}, db_name=db_name)
+def archive_events(retro_hours: float = 72.0, db_name: str = "events.db") -> int:
+    """Move events that ended more than retro_hours ago into archive tables"""
+    return get_store(db_name).archive_events(retro_hours)
 
-    vaccum_events_db(db_name=db_name)
+
+def get_archived_events(
+    program: str,
+    mode: str | None = None,
+    db_name: str = "events.db",
+    start: int | None = None,
+    end: int | None = None,
+) -> list[DERModeControl]:
+    """Get archived events for a program, for audits"""
+    return get_store(db_name).get_archived_events(program, mode, start, end)
@@ -0,0 +1,115 @@
+import logging
+import xml.etree.ElementTree as ET
+from collections.abc import Callable, Iterator
+from itertools import islice
+from pathlib import Path
+
+from .event_models import CurrentStatus, DERControl, DERControlBase
+from .events_db import get_store
+
+log = logging.getLogger(__name__)
+
+
+def _local_name(tag: str) -> str:
+    """Strip the XML namespace from a tag"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _child_text(elem: ET.Element, *path: str) -> str | None:
+    for name in path:
+        elem = next((x for x in elem if _local_name(x.tag) == name), None)
+        if elem is None:
+            return None
+    return elem.text
+
+
+def _control_base(elem: ET.Element) -> DERControlBase | None:
+    """Convert a DERControlBase mode element, e.g. opModExpLimW, or None for modes
+    without a single value such as the links to volt-var and other curves"""
+    mode = _local_name(elem.tag)
+    # Active power has a value and power factor a displacement, both scaled
+    for name in ("value", "displacement"):
+        value = _child_text(elem, name)
+        if value is not None:
+            multiplier = _child_text(elem, "multiplier") or 0
+            return DERControlBase(
+                mode=mode, value=int(value), multiplier=int(multiplier)
+            )
+    text = (elem.text or "").strip()
+    if not text:
+        log.debug(f"Skipping {mode} control, as it has no value")
+        return None
+    if text in ("true", "false"):
+        return DERControlBase(mode=mode, value=int(text == "true"))
+    return DERControlBase(mode=mode, value=int(text))
+
+
+def xml_to_event(elem: ET.Element, program: str = "", primacy: int = 0) -> DERControl:
+    """Convert a SEP2 DERControl XML element to an event"""
+    base = next(x for x in elem if _local_name(x.tag) == "DERControlBase")
+    return DERControl(
+        mRID=_child_text(elem, "mRID"),
+        programName=program,
+        programPrimacy=primacy,
+        creationTime=int(_child_text(elem, "creationTime")),
+        currentStatus=CurrentStatus(
+            int(_child_text(elem, "EventStatus", "currentStatus"))
+        ),
+        statusTime=int(_child_text(elem, "EventStatus", "dateTime") or 0),
+        intervalStart=int(_child_text(elem, "interval", "start")),
+        intervalDuration=int(_child_text(elem, "interval", "duration") or 0),
+        randomizeStart=int(_child_text(elem, "randomizeStart") or 0),
+        randomizeDuration=int(_child_text(elem, "randomizeDuration") or 0),
+        controls=[x for x in map(_control_base, base) if x is not None],
+    )
+
+
+def iter_xml_events(
+    path: Path, program: str = "", primacy: int = 0
+) -> Iterator[DERControl]:
+    """Read events from a DERControlList XML file one at a time"""
+    context = ET.iterparse(path, events=("start", "end"))
+    _, root = next(context)
+    for action, elem in context:
+        if action == "end" and _local_name(elem.tag) == "DERControl":
+            yield xml_to_event(elem, program=program, primacy=primacy)
+            root.clear()  # Drop parsed events so memory stays flat
+
+
+def iter_json_events(path: Path) -> Iterator[DERControl]:
+    """Read events from a newline-delimited JSON file one at a time"""
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield DERControl.model_validate_json(line)
+
+
+def import_events(
+    path: Path,
+    program: str = "",
+    primacy: int = 0,
+    batch_size: int = 1000,
+    progress: Callable[[int], None] | None = None,
+    db_name: str = "events.db",
+) -> int:
+    """Stream events from a .xml DERControlList or newline-delimited JSON file
+    into the database in batches, returning the number imported.
+
+    The program and primacy are only used for XML, as SEP2 carries them on the
+    DERProgram rather than each DERControl.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".xml":
+        events = iter_xml_events(path, program=program, primacy=primacy)
+    else:
+        events = iter_json_events(path)
+
+    store = get_store(db_name)
+    num_events = 0
+    while batch := list(islice(events, batch_size)):
+        store.add_events(batch)
+        num_events += len(batch)
+        if progress is not None:
+            progress(num_events)
+    log.info(f"Imported {num_events} events from {path.name}")
+    return num_events
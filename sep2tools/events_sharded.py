@@ -0,0 +1,244 @@
+import threading
+from collections import defaultdict
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+from urllib.parse import quote, unquote
+
+from .event_models import DERControl, DERModeControl
+from .events_db import EVENTS_DB_DIR, EventRow, EventsStore
+
+SHARD_PREFIX = "shard_"
+
+
+class ShardedEventsStore:
+    """Events store split into one database file per program.
+
+    Each program has its own write lock, so a busy program doesn't block the
+    others. Calls for a program go to its shard, while calls for the whole fleet
+    run on every shard in parallel.
+    """
+
+    def __init__(self, name: str = "events.db", max_workers: int | None = None):
+        self.name = name
+        # Shard names are relative to EVENTS_DB_DIR, like the names of stores
+        name_path = Path(name)
+        self._shard_root = name_path.with_name(f"{name_path.stem}_shards")
+        self.shard_dir = EVENTS_DB_DIR / self._shard_root
+        self._shards: dict[str, EventsStore] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="events-shard")
+
+    def __enter__(self) -> "ShardedEventsStore":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def shard_name(self, program: str) -> str:
+        """The store name for a program, with the program escaped to be safe"""
+        return str(self._shard_root / f"{SHARD_PREFIX}{quote(program, safe='')}.db")
+
+    def shard_path(self, program: str) -> Path:
+        """The database file for a program"""
+        return EVENTS_DB_DIR / self.shard_name(program)
+
+    def shard(self, program: str) -> EventsStore:
+        """Get the store for a program, creating its database on first use."""
+        with self._lock:
+            store = self._shards.get(program)
+            if store is None:
+                self.shard_dir.mkdir(parents=True, exist_ok=True)
+                store = EventsStore(self.shard_name(program))
+                self._shards[program] = store
+            return store
+
+    def _existing_shard(self, program: str) -> EventsStore | None:
+        """Get the store for a program if it has a database, so that reads don't
+        create empty ones"""
+        if program in self._shards or self.shard_path(program).exists():
+            return self.shard(program)
+        return None
+
+    def shards(self) -> list[EventsStore]:
+        """Get the stores of all programs with a database, including those written
+        by other processes."""
+        if self.shard_dir.exists():
+            for path in sorted(self.shard_dir.glob(f"{SHARD_PREFIX}*.db")):
+                self.shard(unquote(path.stem.removeprefix(SHARD_PREFIX)))
+        with self._lock:
+            return list(self._shards.values())
+
+    def _fan_out(self, method: str, *args, **kwargs) -> list:
+        """Call a store method on every shard in parallel"""
+        futures = [
+            self._pool.submit(getattr(store, method), *args, **kwargs)
+            for store in self.shards()
+        ]
+        return [x.result() for x in futures]
+
+    def close(self):
+        """Close every shard, they will be reopened if the store is used again."""
+        with self._lock:
+            for store in self._shards.values():
+                store.close()
+            self._shards.clear()
+
+    def query(self, sql: str, params: Iterable | None = None) -> list[dict[str, Any]]:
+        """Run a query on every shard and return all results as list of dicts."""
+        return [x for res in self._fan_out("query", sql, params) for x in res]
+
+    def execute(self, sql: str, params: Iterable | None = None) -> int:
+        """Run a statement on every shard and return the number of rows changed."""
+        return sum(self._fan_out("execute", sql, params))
+
+    def vacuum(self):
+        """Vacuum every shard."""
+        self._fan_out("vacuum")
+
+    def incremental_vacuum(self, pages: int | None = None) -> int:
+        """Return free pages to the file system, returning the pages still free."""
+        return sum(self._fan_out("incremental_vacuum", pages))
+
+    def add_events(self, events: list[DERControl]):
+        """Add events to the database of their program."""
+        programs = defaultdict(list)
+        for evt in events:
+            programs[evt.programName].append(evt)
+        futures = [
+            self._pool.submit(self.shard(program).add_events, program_events)
+            for program, program_events in programs.items()
+        ]
+        for x in futures:
+            x.result()
+
+    def delete_event(self, mrid: str):
+        """Remove an event from the database"""
+        self._fan_out("delete_event", mrid)
+
+    def supersede_event(self, mrid: str, control_mode: str):
+        """Update the CurrentStatus to Superseded (4)"""
+        self._fan_out("supersede_event", mrid, control_mode)
+
+    def update_default(self, mrid: str, new_status: int, new_duration: int):
+        """Update the status and duration of a default event"""
+        self._fan_out("update_default", mrid, new_status, new_duration)
+
+    def get_programs(self) -> list[str]:
+        """Get list of programs that have events in the database"""
+        programs = self._fan_out("get_programs")
+        return list(dict.fromkeys(x for res in programs for x in res))
+
+    def get_program_modes(self, program: str) -> list[str]:
+        """Get list of control modes that have events for a given program"""
+        store = self._existing_shard(program)
+        return [] if store is None else store.get_program_modes(program)
+
+    def get_events(
+        self,
+        program: str,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> list[DERControl]:
+        """Get all events for a program, or those overlapping [start, end)"""
+        store = self._existing_shard(program)
+        return [] if store is None else store.get_events(program, start, end)
+
+    def get_mode_events(
+        self,
+        program: str,
+        mode: str,
+        start: int | None = None,
+        end: int | None = None,
+        trusted: bool = False,
+    ) -> list[DERModeControl]:
+        """Get all events for a program and control mode, or those in [start, end)"""
+        store = self._existing_shard(program)
+        return (
+            []
+            if store is None
+            else store.get_mode_events(program, mode, start, end, trusted)
+        )
+
+    def get_mode_event_rows(
+        self,
+        program: str,
+        mode: str,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> list[EventRow]:
+        """Get the rows for a program and control mode as named tuples"""
+        store = self._existing_shard(program)
+        return (
+            []
+            if store is None
+            else store.get_mode_event_rows(program, mode, start, end)
+        )
+
+    def get_active_control(
+        self, program: str, mode: str, ts: int
+    ) -> DERModeControl | None:
+        """Get the event controlling a program and mode at a timestamp, if any"""
+        store = self._existing_shard(program)
+        return None if store is None else store.get_active_control(program, mode, ts)
+
+    def get_mode_schedule(
+        self,
+        program: str,
+        mode: str,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> list[DERModeControl]:
+        """Get the condensed schedule for a program and control mode"""
+        store = self._existing_shard(program)
+        return (
+            [] if store is None else store.get_mode_schedule(program, mode, start, end)
+        )
+
+    def get_archived_events(
+        self,
+        program: str,
+        mode: str | None = None,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> list[DERModeControl]:
+        """Get archived events for a program, for audits"""
+        store = self._existing_shard(program)
+        return (
+            []
+            if store is None
+            else store.get_archived_events(program, mode, start, end)
+        )
+
+    def cleanup_defaults(self) -> int:
+        """If a default has been superseded, update the old events"""
+        return sum(self._fan_out("cleanup_defaults"))
+
+    def supersede_overlapping(self) -> dict[str, int]:
+        """Check for events with duplicate control events for same interval"""
+        totals = {"groups": 0, "superseded": 0}
+        for res in self._fan_out("supersede_overlapping"):
+            for key in totals:
+                totals[key] += res[key]
+        return totals
+
+    def delete_superseded(self):
+        """Delete events that have been superseded or cancelled"""
+        self._fan_out("delete_superseded")
+
+    def update_status(self):
+        """Update status of events based on current time"""
+        self._fan_out("update_status")
+
+    def cleanup_events(self):
+        """Run all cleanup functions, each shard in its own transaction"""
+        self._fan_out("cleanup_events")
+
+    def remove_old_events(self, retro_hours: float = 72.0, archive: bool = False):
+        """Delete events that ended more than retro_hours ago, or archive them"""
+        self._fan_out("remove_old_events", retro_hours, archive)
+
+    def archive_events(self, retro_hours: float = 72.0) -> int:
+        """Move events that ended more than retro_hours ago into archive tables"""
+        return sum(self._fan_out("archive_events", retro_hours))
@@ -0,0 +1,83 @@
+from collections.abc import Iterable
+
+from .event_models import DERControl, DERModeControl
+from .event_overlap import _condense_backend
+from .events_db import get_store
+from .timeline import ModeTimeline
+
+
+def merge_timelines(
+    timelines: Iterable[ModeTimeline], mode: str, backend: str = "python"
+) -> ModeTimeline:
+    """Combine condensed timelines from several programs into one schedule,
+    resolved by primacy and then creation time"""
+    merged = ModeTimeline(mode)
+    for timeline in timelines:
+        merged.extend(timeline)
+    return _condense_backend(backend)(merged)
+
+
+def resolve_fleet_timelines(
+    device_programs: dict[str, Iterable[str]],
+    program_timelines: dict[str, dict[str, ModeTimeline]],
+    backend: str = "python",
+) -> dict[str, dict[str, list[DERModeControl]]]:
+    """Get the schedule of each device from the condensed timelines of the
+    programs it is subscribed to.
+
+    Devices subscribed to the same set of programs share one resolved schedule,
+    so the lists returned should not be modified.
+    """
+    resolved = {}
+    schedules = {}
+    for device, programs in device_programs.items():
+        key = frozenset(programs)
+        if key not in resolved:
+            modes = {}
+            for program in sorted(key):
+                for mode, timeline in program_timelines.get(program, {}).items():
+                    modes.setdefault(mode, []).append(timeline)
+            resolved[key] = {
+                mode: merge_timelines(x, mode, backend=backend).to_mode_events()
+                for mode, x in modes.items()
+            }
+        schedules[device] = resolved[key]
+    return schedules
+
+
+def resolve_fleet_schedules(
+    device_programs: dict[str, Iterable[str]],
+    program_events: dict[str, list[DERControl]],
+    backend: str = "python",
+) -> dict[str, dict[str, list[DERModeControl]]]:
+    """Get the schedule of each device from the events of every program.
+    Each program is only condensed once, however many devices use it."""
+    condense = _condense_backend(backend)
+    program_timelines = {
+        program: {
+            mode: condense(timeline)
+            for mode, timeline in ModeTimeline.from_events(events).items()
+        }
+        for program, events in program_events.items()
+    }
+    return resolve_fleet_timelines(device_programs, program_timelines, backend)
+
+
+def resolve_fleet_from_db(
+    device_programs: dict[str, Iterable[str]],
+    backend: str = "python",
+    db_name: str = "events.db",
+) -> dict[str, dict[str, list[DERModeControl]]]:
+    """Get the schedule of each device, using the cached program schedules"""
+    store = get_store(db_name)
+    programs = set().union(*device_programs.values())
+    program_timelines = {
+        program: {
+            mode: ModeTimeline.from_mode_events(
+                store.get_mode_schedule(program, mode), mode=mode
+            )
+            for mode in store.get_program_modes(program)
+        }
+        for program in programs
+    }
+    return resolve_fleet_timelines(device_programs, program_timelines, backend)
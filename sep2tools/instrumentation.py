@@ -0,0 +1,195 @@
+"""Optional latency and row count metrics for the events_db and event_overlap
+entry points. Disabled by default, when each call only checks a module flag."""
+
+import threading
+from bisect import bisect_left
+from collections.abc import Callable
+from functools import wraps
+from time import perf_counter
+from typing import Any
+
+# Upper bounds in seconds, as used by Prometheus histograms
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+METRIC_KINDS = {
+    "function": "Latency of sep2tools functions",
+    "sql": "Latency of SQL statements run on the events database",
+}
+
+_enabled = False
+_lock = threading.Lock()
+_callbacks: list[Callable[[str, str, float, int | None], Any]] = []
+_histograms: dict[tuple[str, str], "Histogram"] = {}
+
+
+class Histogram:
+    """Latency histogram for one function or statement, with the rows returned"""
+
+    __slots__ = ("bucket_counts", "count", "rows", "total")
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.rows = 0
+
+    def observe(self, seconds: float, rows: int | None = None):
+        self.bucket_counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if rows is not None:
+            self.rows += rows
+
+    def cumulative(self) -> list[int]:
+        counts = []
+        total = 0
+        for x in self.bucket_counts:
+            total += x
+            counts.append(total)
+        return counts
+
+
+def enable(callback: Callable[[str, str, float, int | None], Any] | None = None):
+    """Start recording metrics, optionally passing each call to ``callback``
+    as ``callback(kind, name, seconds, rows)``"""
+    global _enabled
+    if callback is not None:
+        add_callback(callback)
+    _enabled = True
+
+
+def disable():
+    """Stop recording metrics, keeping those already recorded"""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def add_callback(callback: Callable[[str, str, float, int | None], Any]):
+    with _lock:
+        _callbacks.append(callback)
+
+
+def remove_callback(callback: Callable[[str, str, float, int | None], Any]):
+    with _lock:
+        _callbacks.remove(callback)
+
+
+def reset():
+    """Clear all recorded metrics and callbacks"""
+    with _lock:
+        _histograms.clear()
+        _callbacks.clear()
+
+
+def _num_rows(result: Any) -> int | None:
+    if isinstance(result, int):
+        return result  # A rowcount
+    if hasattr(result, "__len__"):
+        return len(result)
+    return None
+
+
+def record(kind: str, name: str, seconds: float, rows: int | None = None):
+    """Record one call of a function or SQL statement"""
+    with _lock:
+        key = (kind, name)
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = Histogram()
+        hist.observe(seconds, rows)
+        callbacks = list(_callbacks)
+    for callback in callbacks:
+        callback(kind, name, seconds, rows)
+
+
+def instrumented(name: str) -> Callable:
+    """Record the latency and rows returned by a function while enabled"""
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            t0 = perf_counter()
+            res = func(*args, **kwargs)
+            record("function", name, perf_counter() - t0, _num_rows(res))
+            return res
+
+        return wrapper
+
+    return decorator
+
+
+def instrumented_sql(func: Callable) -> Callable:
+    """Record the latency and rows of a method taking (self, sql, ...)"""
+
+    @wraps(func)
+    def wrapper(self, sql: str, *args, **kwargs):
+        if not _enabled:
+            return func(self, sql, *args, **kwargs)
+        t0 = perf_counter()
+        res = func(self, sql, *args, **kwargs)
+        statement = " ".join(sql.split())
+        record("sql", statement, perf_counter() - t0, _num_rows(res))
+        return res
+
+    return wrapper
+
+
+def snapshot() -> dict[str, dict[str, dict[str, Any]]]:
+    """Get a copy of the recorded metrics, by kind and then name"""
+    res = {kind: {} for kind in METRIC_KINDS}
+    with _lock:
+        for (kind, name), hist in _histograms.items():
+            res[kind][name] = {
+                "count": hist.count,
+                "sum": hist.total,
+                "rows": hist.rows,
+                "buckets": dict(
+                    zip((*LATENCY_BUCKETS, "+Inf"), hist.cumulative(), strict=True)
+                ),
+            }
+    return res
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text() -> str:
+    """Get the recorded metrics in the Prometheus text exposition format"""
+    lines = []
+    for kind, metrics in snapshot().items():
+        metric = f"sep2tools_{kind}_seconds"
+        lines.append(f"# HELP {metric} {METRIC_KINDS[kind]}")
+        lines.append(f"# TYPE {metric} histogram")
+        for name, x in metrics.items():
+            label = f'{kind}="{_label(name)}"'
+            for le, count in x["buckets"].items():
+                lines.append(f'{metric}_bucket{{{label},le="{le}"}} {count}')
+            lines.append(f"{metric}_sum{{{label}}} {x['sum']}")
+            lines.append(f"{metric}_count{{{label}}} {x['count']}")
+        rows_metric = f"sep2tools_{kind}_rows_total"
+        lines.append(f"# HELP {rows_metric} Rows returned or changed")
+        lines.append(f"# TYPE {rows_metric} counter")
+        for name, x in metrics.items():
+            lines.append(f'{rows_metric}{{{kind}="{_label(name)}"}} {x["rows"]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,144 @@
+"""Vectorised condensing and resampling of large schedules, needs the optional
+numpy dependency"""
+
+from array import array
+
+import numpy as np
+
+from .resample import RESAMPLE_METHODS, interval_grid
+from .timeline import TIMELINE_COLS, ModeTimeline
+
+
+def _column(values: array) -> np.ndarray:
+    return np.frombuffer(values, dtype=np.dtype(values.typecode))
+
+
+def _take(
+    timeline: ModeTimeline, rows: np.ndarray, starts: np.ndarray, durations: np.ndarray
+) -> ModeTimeline:
+    """Vectorised version of ``ModeTimeline.take``"""
+    new = timeline.take([], [], [])
+    for col in ("mrid_index", "program_index", *TIMELINE_COLS):
+        getattr(new, col).frombytes(_column(getattr(timeline, col))[rows].tobytes())
+    new.starts = array("q", starts.astype(np.int64).tobytes())
+    new.durations = array("q", durations.astype(np.int64).tobytes())
+    return new
+
+
+def condense_timeline_np(timeline: ModeTimeline) -> ModeTimeline:
+    """Condense a timeline to the winning event for each period of time.
+
+    Gives the same result as ``event_overlap.condense_timeline``, but memory use
+    grows with the total number of periods each event covers.
+    """
+    starts = _column(timeline.starts)
+    durations = _column(timeline.durations)
+    primacy = _column(timeline.primacy)
+    creation = _column(timeline.creation)
+    mrid_index = _column(timeline.mrid_index)
+
+    valid = np.flatnonzero(durations > 0)  # Zero length events are never active
+    if not valid.size:
+        return timeline.take([], [], [])
+    starts = starts[valid]
+    ends = starts + durations[valid]
+
+    # Split into elementary periods between every start and end point
+    bounds = np.unique(np.concatenate((starts, ends)))
+    first = np.searchsorted(bounds, starts)
+    counts = np.searchsorted(bounds, ends) - first
+
+    # Rank by lowest primacy, then latest creation time, then input order
+    order = np.lexsort((valid, -creation[valid], primacy[valid]))
+    rank = np.empty_like(order)
+    rank[order] = np.arange(order.size)
+
+    # Every (period, event) pair, keeping the best ranked event for each period
+    pair_rank = np.repeat(rank, counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    pair_period = np.repeat(first, counts) + offsets
+    pairs = np.lexsort((pair_rank, pair_period))
+    pair_period = pair_period[pairs]
+    is_first = np.empty(pairs.size, dtype=bool)
+    is_first[0] = True
+    np.not_equal(pair_period[1:], pair_period[:-1], out=is_first[1:])
+    periods = pair_period[is_first]
+    winners = valid[order[pair_rank[pairs][is_first]]]
+
+    # Restitch consecutive periods won by the same event
+    mrids = mrid_index[winners]
+    is_new = np.empty(periods.size, dtype=bool)
+    is_new[0] = True
+    is_new[1:] = (mrids[1:] != mrids[:-1]) | (periods[1:] != periods[:-1] + 1)
+    seg_first = np.flatnonzero(is_new)
+    seg_last = np.append(seg_first[1:], periods.size) - 1
+    seg_starts = bounds[periods[seg_first]]
+    seg_ends = bounds[periods[seg_last] + 1]
+    return _take(timeline, winners[seg_first], seg_starts, seg_ends - seg_starts)
+
+
+def resample_timeline_np(
+    timeline: ModeTimeline,
+    start: int,
+    end: int,
+    interval_min: int = 5,
+    method: str = "start",
+) -> np.ndarray:
+    """Vectorised version of ``resample.resample_timeline``"""
+    if method not in RESAMPLE_METHODS:
+        raise ValueError(f"Unknown resample method: {method}")
+    step = interval_min * 60
+    grid_start, num = interval_grid(start, end, interval_min)
+    grid = grid_start + step * np.arange(num + 1, dtype=np.int64)
+    out = np.full(num, np.nan)
+
+    seg_starts = _column(timeline.starts)
+    durations = _column(timeline.durations)
+    keep = durations > 0
+    seg_starts = seg_starts[keep]
+    durations = durations[keep]
+    if not seg_starts.size or not num:
+        return out
+    seg_ends = seg_starts + durations
+    values = (
+        _column(timeline.values)[keep] * 10.0 ** _column(timeline.multipliers)[keep]
+    )
+
+    if method == "start":
+        idx = np.searchsorted(seg_starts, grid[:-1], side="right") - 1
+        found = idx >= 0
+        found[found] = grid[:-1][found] < seg_ends[idx[found]]
+        out[found] = values[idx[found]]
+        return out
+
+    if method == "mean":
+        # Integrate value and covered time up to each grid point, then difference
+        idx = np.searchsorted(seg_starts, grid, side="right") - 1
+        found = idx >= 0
+        idx = np.maximum(idx, 0)
+        cum_time = np.concatenate(([0], np.cumsum(durations)))
+        cum_value = np.concatenate(([0.0], np.cumsum(values * durations)))
+        partial = np.where(found, np.clip(grid - seg_starts[idx], 0, durations[idx]), 0)
+        covered = np.diff(np.where(found, cum_time[idx] + partial, 0))
+        sums = np.diff(np.where(found, cum_value[idx] + values[idx] * partial, 0.0))
+        has_cover = covered > 0
+        out[has_cover] = sums[has_cover] / covered[has_cover]
+        return out
+
+    # Expand each event to the intervals it overlaps, then take the minimum
+    grid_end = grid[-1]
+    overlaps = (seg_ends > grid_start) & (seg_starts < grid_end)
+    seg_starts = np.maximum(seg_starts[overlaps], grid_start)
+    seg_ends = np.minimum(seg_ends[overlaps], grid_end)
+    values = values[overlaps]
+    if not values.size:
+        return out
+    first = (seg_starts - grid_start) // step
+    last = (seg_ends - 1 - grid_start) // step
+    counts = last - first + 1
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    intervals = np.repeat(first, counts) + offsets
+    pair_values = np.repeat(values, counts)
+    group_first = np.flatnonzero(np.diff(intervals, prepend=-1))
+    out[intervals[group_first]] = np.minimum.reduceat(pair_values, group_first)
+    return out
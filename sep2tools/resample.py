@@ -0,0 +1,143 @@
+from array import array
+from collections.abc import Callable
+from math import isnan, nan
+
+from .event_models import DERModeControl
+from .events_db import get_mode_schedule
+from .timeline import ModeTimeline
+
+RESAMPLE_METHODS = ("start", "min", "mean")
+
+
+def interval_grid(start: int, end: int, interval_min: int = 5) -> tuple[int, int]:
+    """Align a time window to the interval grid, returning (start, num intervals)"""
+    step = interval_min * 60
+    grid_start = start - start % step
+    num = -(-(end - grid_start) // step)
+    return grid_start, max(num, 0)
+
+
+def _scaled_values(timeline: ModeTimeline) -> list[float]:
+    return [
+        val * 10.0**multi
+        for val, multi in zip(timeline.values, timeline.multipliers, strict=True)
+    ]
+
+
+def resample_timeline(
+    timeline: ModeTimeline,
+    start: int,
+    end: int,
+    interval_min: int = 5,
+    method: str = "start",
+) -> array:
+    """Resample a condensed timeline onto a fixed interval grid.
+
+    ``start`` takes the value in effect at the start of each interval, ``min``
+    the lowest value during the interval, and ``mean`` the time weighted average
+    over the part of the interval covered by events.
+    Intervals without any event are NaN.
+    """
+    if method not in RESAMPLE_METHODS:
+        raise ValueError(f"Unknown resample method: {method}")
+    step = interval_min * 60
+    grid_start, num = interval_grid(start, end, interval_min)
+    grid_end = grid_start + num * step
+    out = array("d", [nan]) * num
+    if method == "mean":
+        sums = array("d", [0.0]) * num
+        covered = array("q", [0]) * num
+
+    values = _scaled_values(timeline)
+    for seg_start, duration, val in zip(
+        timeline.starts, timeline.durations, values, strict=True
+    ):
+        seg_end = min(seg_start + duration, grid_end)
+        seg_start = max(seg_start, grid_start)
+        if seg_start >= seg_end:
+            continue
+        first = (seg_start - grid_start) // step
+        last = (seg_end - 1 - grid_start) // step
+        if method == "start":
+            # Intervals whose start falls within the event
+            first = -(-(seg_start - grid_start) // step)
+            out[first : last + 1] = array("d", [val]) * (last + 1 - first)
+        elif method == "min":
+            for i in range(first, last + 1):
+                if isnan(out[i]) or val < out[i]:
+                    out[i] = val
+        else:
+            for i in range(first, last + 1):
+                interval_start = grid_start + i * step
+                overlap = min(seg_end, interval_start + step) - max(
+                    seg_start, interval_start
+                )
+                sums[i] += val * overlap
+                covered[i] += overlap
+
+    if method == "mean":
+        for i in range(num):
+            if covered[i]:
+                out[i] = sums[i] / covered[i]
+    return out
+
+
+def _resample_backend(backend: str) -> Callable[..., array]:
+    if backend == "python":
+        return resample_timeline
+    if backend == "numpy":
+        from .overlap_numpy import resample_timeline_np  # Optional dependency
+
+        return resample_timeline_np
+    raise ValueError(f"Unknown resample backend: {backend}")
+
+
+def resample_mode_events(
+    events: list[DERModeControl],
+    start: int,
+    end: int,
+    interval_min: int = 5,
+    method: str = "start",
+    backend: str = "python",
+):
+    """Resample a condensed schedule onto a fixed interval grid"""
+    resample = _resample_backend(backend)
+    timeline = ModeTimeline.from_mode_events(events)
+    return resample(timeline, start, end, interval_min, method)
+
+
+def resample_schedules(
+    schedules: dict,
+    start: int,
+    end: int,
+    interval_min: int = 5,
+    method: str = "start",
+    backend: str = "python",
+) -> dict:
+    """Resample many condensed schedules onto the same interval grid"""
+    resample = _resample_backend(backend)
+    return {
+        key: resample(
+            ModeTimeline.from_mode_events(events), start, end, interval_min, method
+        )
+        for key, events in schedules.items()
+    }
+
+
+def get_mode_resampled(
+    program: str,
+    mode: str,
+    start: int,
+    end: int,
+    interval_min: int = 5,
+    method: str = "start",
+    backend: str = "python",
+    db_name: str = "events.db",
+):
+    """Get the schedule for a program mode on a fixed interval grid"""
+    grid_start, num = interval_grid(start, end, interval_min)
+    grid_end = grid_start + num * interval_min * 60
+    events = get_mode_schedule(program, mode, db_name, start=grid_start, end=grid_end)
+    return resample_mode_events(
+        events, start, end, interval_min, method=method, backend=backend
+    )
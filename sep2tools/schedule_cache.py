@@ -0,0 +1,101 @@
+from bisect import bisect_left, bisect_right
+
+from .event_models import DERModeControl
+
+
+def clip_schedule(
+    schedule: list[DERModeControl], start: int | None, end: int | None
+) -> list[DERModeControl]:
+    """Get the condensed events that overlap [start, end), without trimming them"""
+    first = 0
+    last = len(schedule)
+    if start is not None:
+        first = bisect_right(schedule, start, key=lambda x: x.intervalEnd)
+    if end is not None:
+        last = bisect_left(schedule, end, key=lambda x: x.intervalStart)
+    return schedule[first:last]
+
+
+def _trim(evt: DERModeControl, start: int, end: int) -> DERModeControl:
+    new_start = max(evt.intervalStart, start)
+    new_end = min(evt.intervalEnd, end)
+    if new_start == evt.intervalStart and new_end == evt.intervalEnd:
+        return evt
+    update = {"intervalStart": new_start, "intervalDuration": new_end - new_start}
+    return evt.model_copy(update=update)
+
+
+def _restitch(schedule: list[DERModeControl], evt: DERModeControl):
+    """Append an event, joining it to the previous one if it continues it"""
+    prev_evt = schedule[-1] if schedule else None
+    if (
+        prev_evt is not None
+        and prev_evt.mRID == evt.mRID
+        and prev_evt.intervalEnd == evt.intervalStart
+    ):
+        duration = evt.intervalEnd - prev_evt.intervalStart
+        schedule[-1] = prev_evt.model_copy(update={"intervalDuration": duration})
+    else:
+        schedule.append(evt)
+
+
+def splice_schedule(
+    schedule: list[DERModeControl],
+    start: int,
+    end: int,
+    patch: list[DERModeControl],
+) -> list[DERModeControl]:
+    """Replace the [start, end) part of a condensed schedule.
+
+    The patch is the condensed schedule of the events overlapping [start, end).
+    It is trimmed to the range and restitched to the unchanged events either side.
+    """
+    new_schedule = clip_schedule(schedule, None, start)
+    if new_schedule:
+        prev_evt = new_schedule[-1]
+        new_schedule[-1] = _trim(prev_evt, prev_evt.intervalStart, start)
+    for evt in clip_schedule(patch, start, end):
+        _restitch(new_schedule, _trim(evt, start, end))
+    after = clip_schedule(schedule, end, None)
+    if after:
+        _restitch(new_schedule, _trim(after[0], end, after[0].intervalEnd))
+        new_schedule.extend(after[1:])
+    return new_schedule
+
+
+class ScheduleCache:
+    """Condensed schedules per (program, mode), with the time ranges changed
+    since each was condensed so only those parts need to be recomputed."""
+
+    def __init__(self):
+        self._schedules: dict[tuple[str, str], list[DERModeControl]] = {}
+        self._changes: dict[tuple[str, str], list[tuple[int, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._schedules)
+
+    def get(self, key: tuple[str, str]) -> list[DERModeControl] | None:
+        return self._schedules.get(key)
+
+    def set(self, key: tuple[str, str], schedule: list[DERModeControl]):
+        self._schedules[key] = schedule
+        self._changes.pop(key, None)
+
+    def mark_changed(self, key: tuple[str, str], start: int, end: int):
+        """Record that events in [start, end) have changed"""
+        if key in self._schedules and end > start:
+            self._changes.setdefault(key, []).append((start, end))
+
+    def pop_changes(self, key: tuple[str, str]) -> list[tuple[int, int]]:
+        """Get the changed ranges for a schedule, merging any that overlap"""
+        merged = []
+        for start, end in sorted(self._changes.pop(key, [])):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+            else:
+                merged.append((start, end))
+        return merged
+
+    def clear(self):
+        self._schedules.clear()
+        self._changes.clear()
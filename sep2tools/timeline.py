@@ -0,0 +1,158 @@
+from array import array
+from collections.abc import Iterable
+
+from .event_models import MODE_EVENT_LIST, DERControl, DERModeControl
+
+# Integer columns, one value per event
+TIMELINE_COLS = (
+    "starts",
+    "durations",
+    "primacy",
+    "creation",
+    "values",
+    "multipliers",
+    "status",
+    "status_times",
+    "defaults",
+    "randomize_starts",
+    "randomize_durations",
+)
+
+
+def _index(values: list[str], lookup: dict[str, int], value: str) -> int:
+    i = lookup.get(value)
+    if i is None:
+        i = len(values)
+        values.append(value)
+        lookup[value] = i
+    return i
+
+
+class ModeTimeline:
+    """Events for a single control mode, held as parallel arrays of integers
+    rather than a pydantic model per event.
+
+    The mRID and programName of each row are indexes into the ``mrids`` and
+    ``programs`` lists, and ``mrid_lookup`` maps an mRID back to its index.
+    """
+
+    __slots__ = (
+        "mode",
+        "mrids",
+        "mrid_lookup",
+        "programs",
+        "program_lookup",
+        "mrid_index",
+        "program_index",
+        *TIMELINE_COLS,
+    )
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.mrids: list[str] = []
+        self.mrid_lookup: dict[str, int] = {}
+        self.programs: list[str] = []
+        self.program_lookup: dict[str, int] = {}
+        self.mrid_index = array("l")
+        self.program_index = array("l")
+        for col in TIMELINE_COLS:
+            setattr(self, col, array("q"))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def append(self, evt: DERModeControl | DERControl, value: int, multiplier: int):
+        """Add a row for an event, with the value of this timeline's mode"""
+        self.mrid_index.append(_index(self.mrids, self.mrid_lookup, evt.mRID))
+        program = evt.programName
+        self.program_index.append(_index(self.programs, self.program_lookup, program))
+        self.starts.append(evt.intervalStart)
+        self.durations.append(evt.intervalDuration)
+        self.primacy.append(evt.programPrimacy)
+        self.creation.append(evt.creationTime)
+        self.values.append(value)
+        self.multipliers.append(multiplier)
+        self.status.append(evt.currentStatus)
+        self.status_times.append(evt.statusTime)
+        self.defaults.append(evt.isDefault)
+        self.randomize_starts.append(evt.randomizeStart)
+        self.randomize_durations.append(evt.randomizeDuration)
+
+    def take(
+        self, rows: Iterable[int], starts: Iterable[int], durations: Iterable[int]
+    ) -> "ModeTimeline":
+        """Copy the given rows to a new timeline, with new start times and durations.
+        The new timeline shares the mRID and program lists with this one."""
+        new = ModeTimeline(self.mode)
+        new.mrids = self.mrids
+        new.mrid_lookup = self.mrid_lookup
+        new.programs = self.programs
+        new.program_lookup = self.program_lookup
+        rows = list(rows)
+        new.mrid_index = array("l", [self.mrid_index[i] for i in rows])
+        new.program_index = array("l", [self.program_index[i] for i in rows])
+        for col in TIMELINE_COLS:
+            values = getattr(self, col)
+            setattr(new, col, array("q", [values[i] for i in rows]))
+        new.starts = array("q", starts)
+        new.durations = array("q", durations)
+        return new
+
+    def extend(self, other: "ModeTimeline"):
+        """Append the rows of another timeline for the same mode"""
+        mrids = [_index(self.mrids, self.mrid_lookup, x) for x in other.mrids]
+        programs = [
+            _index(self.programs, self.program_lookup, x) for x in other.programs
+        ]
+        self.mrid_index.extend(mrids[i] for i in other.mrid_index)
+        self.program_index.extend(programs[i] for i in other.program_index)
+        for col in TIMELINE_COLS:
+            getattr(self, col).extend(getattr(other, col))
+
+    @classmethod
+    def from_mode_events(
+        cls, events: list[DERModeControl], mode: str | None = None
+    ) -> "ModeTimeline":
+        """Build a timeline from mode events, which should all have the same mode"""
+        if mode is None:
+            mode = events[0].controlMode if events else ""
+        timeline = cls(mode)
+        for evt in events:
+            timeline.append(evt, evt.controlValue, evt.controlMultiplier)
+        return timeline
+
+    @classmethod
+    def from_events(cls, events: list[DERControl]) -> dict[str, "ModeTimeline"]:
+        """Build a timeline for each control mode used by the events"""
+        timelines = {}
+        for evt in events:
+            for cntrl in evt.controls:
+                mode = cntrl.mode
+                if mode not in timelines:
+                    timelines[mode] = cls(mode)
+                timelines[mode].append(evt, cntrl.value, cntrl.multiplier)
+        return timelines
+
+    def to_mode_events(self) -> list[DERModeControl]:
+        """Convert back to mode events, validating them all in one call"""
+        return MODE_EVENT_LIST.validate_python(
+            [
+                {
+                    "mRID": self.mrids[self.mrid_index[i]],
+                    "programName": self.programs[self.program_index[i]],
+                    "programPrimacy": self.primacy[i],
+                    "creationTime": self.creation[i],
+                    "currentStatus": self.status[i],
+                    "statusTime": self.status_times[i],
+                    "isDefault": bool(self.defaults[i]),
+                    "intervalStart": self.starts[i],
+                    "intervalDuration": self.durations[i],
+                    "randomizeStart": self.randomize_starts[i],
+                    "randomizeDuration": self.randomize_durations[i],
+                    "controlMode": self.mode,
+                    "controlValue": self.values[i],
+                    "controlMultiplier": self.multipliers[i],
+                }
+                for i in range(len(self))
+            ]
+        )
@@ -1,8 +1,24 @@
-from datetime import UTC, date, datetime, timedelta
+from bisect import bisect_right
+from collections.abc import Iterable
+from datetime import UTC, date, datetime, timedelta, timezone, tzinfo
+from functools import lru_cache
+from zoneinfo import ZoneInfo
 
 from dateutil import tz
 
-DEFAULT_TZ = tz.gettz("Australia/Brisbane")
+
+@lru_cache(maxsize=64)
+def get_timezone(name: str, backend: str = "zoneinfo") -> tzinfo:
+    """Get a timezone by name, zoneinfo is faster than dateutil for conversions"""
+    if backend == "zoneinfo":
+        return ZoneInfo(name)
+    if backend == "dateutil":
+        return tz.gettz(name)
+    raise ValueError(f"Unknown timezone backend: {backend}")
+
+
+DEFAULT_TZ = get_timezone("Australia/Brisbane", backend="dateutil")
+EPOCH = datetime(1970, 1, 1)
 
 
 def current_timestamp() -> int:
@@ -28,6 +44,84 @@ def timestamp_local_dt(start: int, tzinfo=DEFAULT_TZ) -> datetime:
     return utc_dt.astimezone(tzinfo)
 
 
+class _ZoneKey:
+    """Hash timezones by identity, as dateutil zones can't be hashed"""
+
+    __slots__ = ("zone",)
+
+    def __init__(self, zone: tzinfo):
+        self.zone = zone
+
+    def __hash__(self) -> int:
+        return id(self.zone)
+
+    def __eq__(self, other) -> bool:
+        return self.zone is other.zone
+
+
+def _utc_offset(ts: int, tzinfo: tzinfo) -> int:
+    return int(datetime.fromtimestamp(ts, tz=tzinfo).utcoffset().total_seconds())
+
+
+@lru_cache(maxsize=128)
+def _year_offsets(key: _ZoneKey, year: int) -> tuple[list[int], list[int], list[int]]:
+    """Get the times the UTC offset changes in a (UTC) year, the offset from then,
+    and until when local times are repeated after a clock is wound back"""
+    zone = key.zone
+    start = int(datetime(year, 1, 1, tzinfo=UTC).timestamp())
+    end = int(datetime(year + 1, 1, 1, tzinfo=UTC).timestamp())
+    changes = [start]
+    offsets = [_utc_offset(start, zone)]
+    repeats = [start]
+    for day_end in range(start + 86400, end + 86400, 86400):
+        day_end = min(day_end, end)
+        offset = _utc_offset(day_end, zone)
+        if offset == offsets[-1]:
+            continue
+        # Find the exact second it changed
+        lo, hi = day_end - 86400, day_end
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if _utc_offset(mid, zone) == offset:
+                hi = mid
+            else:
+                lo = mid
+        repeats.append(hi + max(offsets[-1] - offset, 0))
+        changes.append(hi)
+        offsets.append(offset)
+    return changes, offsets, repeats
+
+
+def timestamps_local_dt(
+    timestamps: Iterable[int], tzinfo=DEFAULT_TZ, strip_tz: bool = False
+) -> list[datetime]:
+    """Convert many timestamps to local datetimes, the same as timestamp_local_dt.
+
+    The UTC offset changes of each year are worked out once per timezone, so
+    each conversion is a bisect rather than a timezone lookup.
+    """
+    if not strip_tz and isinstance(tzinfo, ZoneInfo | timezone):
+        # These convert in C, which is faster once the zone has to be attached
+        return [datetime.fromtimestamp(x, tz=tzinfo) for x in timestamps]
+    key = _ZoneKey(tzinfo)
+    year_start = year_end = 0
+    changes = offsets = repeats = []
+    results = []
+    for ts in timestamps:
+        if not year_start <= ts < year_end:
+            year = datetime.fromtimestamp(ts, tz=UTC).year
+            changes, offsets, repeats = _year_offsets(key, year)
+            year_start = changes[0]
+            year_end = int(datetime(year + 1, 1, 1, tzinfo=UTC).timestamp())
+        i = bisect_right(changes, ts) - 1
+        local_dt = EPOCH + timedelta(seconds=ts + offsets[i])
+        if not strip_tz:
+            fold = 1 if ts < repeats[i] else 0
+            local_dt = local_dt.replace(tzinfo=tzinfo, fold=fold)
+        results.append(local_dt)
+    return results
+
+
 def day_time_range(day: date, tzinfo=DEFAULT_TZ) -> tuple[int, int]:
     day_start = datetime(day.year, day.month, day.day, tzinfo=tzinfo)
     day_end = day_start + timedelta(days=1)
@@ -1,6 +1,12 @@
-from sep2tools.event_examples import example_default_control
-from sep2tools.events_clean import get_mode_event_values
+from sep2tools import generate_mrid
+from sep2tools.event_examples import example_control, example_default_control
+from sep2tools.events_clean import (
+    get_mode_event_columns,
+    get_mode_event_values,
+    iter_mode_event_values,
+)
 from sep2tools.events_db import add_events, cleanup_events, get_program_modes
+from sep2tools.times import current_timestamp, timestamp_local_dt
 
 
 def test_get_mode_event_values_example():
@@ -21,3 +27,35 @@ def test_get_mode_event_values_empty():
     mode = "NOTAMODE"
     events = get_mode_event_values(program=program, mode=mode, retro_hours=12)
     assert len(events) == 0
+
+
+def test_mode_event_streaming_forms():
+    program = "EXAMPLEPRG"
+    add_events([example_default_control(program=program)])
+    cleanup_events()
+    mode = get_program_modes(program=program)[0]
+    events = get_mode_event_values(program=program, mode=mode, retro_hours=12)
+    points = list(iter_mode_event_values(program=program, mode=mode, retro_hours=12))
+    assert points == [(x["ts"], x["value"]) for x in events]
+    columns = get_mode_event_columns(program=program, mode=mode, retro_hours=12)
+    assert columns["ts"] == [x["ts"] for x in events]
+    assert list(columns["value"]) == [x["value"] for x in events]
+
+
+def test_get_mode_event_values_steps_from_earlier_event():
+    """The value before the window is stepped from, even if it ended long ago"""
+    program = f"STEPPRG{generate_mrid(0)}"  # Not in the database from past runs
+    now = current_timestamp()
+    old_evt = example_control(now - 3 * 86400, program=program)
+    next_evt = example_control(now + 3600, program=program)
+    for evt, value in ((old_evt, 9), (next_evt, 3)):
+        evt.controls = evt.controls[:1]
+        evt.controls[0].value = value
+    add_events([old_evt, next_evt])
+    mode = old_evt.controls[0].mode
+    start = next_evt.intervalStart
+    events = get_mode_event_values(program=program, mode=mode, retro_hours=12)
+    assert events == [
+        {"ts": timestamp_local_dt(start - 1).replace(tzinfo=None), "value": 9},
+        {"ts": timestamp_local_dt(start).replace(tzinfo=None), "value": 3},
+    ]
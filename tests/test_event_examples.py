@@ -1,4 +1,10 @@
-from sep2tools.event_examples import example_controls, example_default_control
+import pytest
+
+from sep2tools.event_examples import (
+    example_controls,
+    example_default_control,
+    example_schedule,
+)
 from sep2tools.events_db import add_events, remove_old_events
 
 
@@ -11,3 +17,22 @@ def test_create_cleanup_events():
     ]
     add_events(example_events)
     remove_old_events(retro_hours=24.0)
+
+
+def test_example_schedule():
+    """Check the synthetic schedule scales and is reproducible"""
+    start = 1780000000  # The default start is the next interval, which can change
+    events = example_schedule(num_events=100, num_modes=4, num_programs=2, start=start)
+    assert len(events) == 102
+    assert {x.programName for x in events} == {"PRG0", "PRG1"}
+    assert all(len(x.controls) == 4 for x in events)
+    assert sum(x.isDefault for x in events) == 2
+    again = example_schedule(num_events=100, num_modes=4, num_programs=2, start=start)
+    assert [x.intervalStart for x in again] == [x.intervalStart for x in events]
+
+    dense = example_schedule(num_events=100, overlap=10.0, start=0)
+    assert max(x.intervalStart for x in dense) < 3000
+    with pytest.raises(ValueError):
+        example_schedule(num_modes=20)
+    with pytest.raises(ValueError):
+        example_schedule(overlap=0)
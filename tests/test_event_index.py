@@ -0,0 +1,69 @@
+import random
+
+from sep2tools.event_examples import example_control, example_default_control
+from sep2tools.event_index import ActiveControlIndex
+from sep2tools.event_overlap import condense_mode_events
+from sep2tools.events_db import EventsStore, get_active_control
+
+MODE = "opModExpLimW"
+
+
+def linear_active_at(events, ts):
+    for evt in events:
+        if evt.intervalStart <= ts < evt.intervalEnd:
+            return evt
+    return None
+
+
+def test_active_control_lookup(tmp_path):
+    """Check the index and SQL lookups match a scan of the condensed schedule"""
+    rng = random.Random(2034)
+    default = example_default_control(program="PRG")
+    default.intervalDuration = 7200
+    start = default.intervalStart
+    events = [default]
+    for _ in range(40):
+        evt = example_control(start + rng.randrange(-600, 9000, 60), program="PRG")
+        evt.intervalDuration = rng.randrange(60, 1200, 60)
+        evt.programPrimacy = rng.randint(0, 2)
+        evt.creationTime += rng.randint(0, 5)
+        events.append(evt)
+
+    db_name = str(tmp_path / "events.db")
+    with EventsStore(db_name) as store:
+        store.add_events(events)
+        schedule = condense_mode_events(store.get_mode_events("PRG", MODE))
+    index = ActiveControlIndex(schedule)
+    assert len(index) == len(schedule)
+
+    timestamps = list(range(start - 900, start + 11000, 45))
+    expected = [linear_active_at(schedule, ts) for ts in timestamps]
+    assert [index.active_at(ts) for ts in timestamps] == expected
+    assert index.active_at_many(timestamps) == expected
+    shuffled = rng.sample(timestamps, len(timestamps))
+    assert index.active_at_many(shuffled) == [index.active_at(x) for x in shuffled]
+
+    for ts, evt in zip(timestamps[::10], expected[::10], strict=True):
+        active = get_active_control("PRG", MODE, ts, db_name=db_name)
+        assert (active and active.mRID) == (evt and evt.mRID)
+
+
+def test_active_control_ties():
+    """Check events tied on primacy, creation and start are picked the same way"""
+    rng = random.Random(7)
+    with EventsStore(":memory:") as store:
+        for program in (f"PRG{i}" for i in range(20)):
+            events = []
+            for _ in range(8):
+                start = 1780000000 + rng.choice((0, 300))
+                evt = example_control(start, program=program)
+                evt.intervalDuration = rng.choice((300, 600, 900))
+                evt.creationTime = 1770000000
+                events.append(evt)
+            store.add_events(events)
+
+            index = ActiveControlIndex(store.get_mode_schedule(program, MODE))
+            for ts in range(1779999900, 1780001300, 50):
+                active = store.get_active_control(program, MODE, ts)
+                expected = index.active_at(ts)
+                assert (active and active.mRID) == (expected and expected.mRID)
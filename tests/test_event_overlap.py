@@ -1,9 +1,23 @@
+import random
+
+import pytest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 from sep2tools.event_models import (
     CurrentStatus,
     DERControl,
     DERControlBase,
+    DERModeControl,
+)
+from sep2tools.event_overlap import (
+    condense_events,
+    condense_mode_events,
+    non_overlapping_periods,
+    split_overlapping_events,
 )
-from sep2tools.event_overlap import condense_events
 
 EXAMPLE_EVENTS = [
     DERControl(
@@ -90,8 +104,143 @@ def test_event_condensing():
     assert b.mRID == "2"
     assert b.intervalEnd == 120  # and not 150
 
+    # Check that Evt 3 keeps its full length after being restitched
+    a = exp_evts[2]
+    assert a.mRID == "3"
+    assert a.intervalStart == 120
+    assert a.intervalEnd == 170
+
     # Check that Evt 4 is started late
     c = exp_evts[3]
     assert c.mRID == "4"
     assert c.intervalStart == 170  # and not 150
     assert c.intervalDuration == 30
+
+
+def reference_non_overlapping_periods(events):
+    """Original nested scan implementation, kept to check the sweep against"""
+    time_points = sorted(
+        [(s, "start") for s, _ in events] + [(e, "end") for _, e in events]
+    )
+    unique_intervals = []
+    current_interval_start = None
+    for time, _ in time_points:
+        if current_interval_start is not None and time > current_interval_start:
+            unique_intervals.append((current_interval_start, time))
+        current_interval_start = time
+
+    split_events = set()
+    for interval_start, interval_end in unique_intervals:
+        for start, end in events:
+            if start < interval_end and end > interval_start:
+                split_events.add((max(start, interval_start), min(end, interval_end)))
+    return sorted(split_events)
+
+
+def reference_split_overlapping_events(events):
+    new_events = []
+    times = [(x.intervalStart, x.intervalEnd) for x in events]
+    for xstart, xend in reference_non_overlapping_periods(times):
+        for evt in events:
+            if evt.intervalStart >= xend or evt.intervalEnd <= xstart:
+                continue
+            new_events.append((evt.mRID, xstart, xend - xstart))
+    return new_events
+
+
+def random_mode_events(rng: random.Random, num: int) -> list[DERModeControl]:
+    return [
+        DERModeControl(
+            mRID=str(i),
+            programPrimacy=rng.randint(0, 3),
+            creationTime=rng.randint(0, 5),
+            currentStatus=CurrentStatus(0),
+            intervalStart=rng.randrange(0, 1000, 10),
+            intervalDuration=rng.randrange(0, 300, 10),
+            controlMode="opModExpLimW",
+            controlValue=rng.randint(0, 100),
+        )
+        for i in range(num)
+    ]
+
+
+def test_split_matches_reference():
+    """Check the sweep gives the same splits as the nested scan"""
+    rng = random.Random(2030)
+    for num in (0, 1, 2, 5, 20, 100):
+        for _ in range(20):
+            events = random_mode_events(rng, num)
+            times = [(x.intervalStart, x.intervalEnd) for x in events]
+            assert non_overlapping_periods(times) == reference_non_overlapping_periods(
+                times
+            )
+            split = [
+                (x.mRID, x.intervalStart, x.intervalDuration)
+                for x in split_overlapping_events(events)
+            ]
+            assert split == reference_split_overlapping_events(events)
+
+
+def reference_condense_mode_events(events):
+    """Pick the winner of every split period, then join contiguous winners"""
+    periods = {}
+    for evt in split_overlapping_events(events):
+        periods.setdefault(evt.intervalStart, []).append(evt)
+    condensed = []
+    for start in sorted(periods):
+        evt = min(periods[start], key=lambda x: (x.programPrimacy, -x.creationTime))
+        prev = condensed[-1] if condensed else None
+        if prev and prev[0] == evt.mRID and prev[1] + prev[2] == start:
+            condensed[-1] = (prev[0], prev[1], prev[2] + evt.intervalDuration)
+        else:
+            condensed.append((evt.mRID, start, evt.intervalDuration))
+    return condensed
+
+
+BACKENDS = [
+    "python",
+    pytest.param("numpy", marks=pytest.mark.skipif(numpy is None, reason="numpy")),
+]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_condense_matches_reference(backend):
+    """Check the winner selection of each backend on random schedules"""
+    rng = random.Random(2031)
+    for num in (0, 1, 2, 5, 20, 100):
+        for _ in range(20):
+            events = random_mode_events(rng, num)
+            condensed = [
+                (x.mRID, x.intervalStart, x.intervalDuration)
+                for x in condense_mode_events(events, backend=backend)
+            ]
+            assert condensed == reference_condense_mode_events(events)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_condense_backends_conform(backend):
+    """Check each backend gives exactly the same events as the python one"""
+    rng = random.Random(2033)
+    for num in (0, 1, 50, 2000):
+        events = random_mode_events(rng, num)
+        for i, evt in enumerate(events):
+            evt.mRID = str(i % max(num // 3, 1))  # Reused mRIDs can restitch
+        expected = condense_mode_events(events)
+        assert condense_mode_events(events, backend=backend) == expected
+
+    schedule = condense_events(EXAMPLE_EVENTS, backend=backend)
+    assert schedule == condense_events(EXAMPLE_EVENTS)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        condense_events(EXAMPLE_EVENTS, backend="fortran")
+
+
+def test_nested_periods():
+    """Check deeply nested events split into one period per boundary"""
+    times = [(i, 10_000 - i) for i in range(2000)]
+    periods = non_overlapping_periods(times)
+    assert len(periods) == 2 * len(times) - 1
+    assert periods[0] == (0, 1)
+    assert periods[-1] == (9999, 10_000)
@@ -0,0 +1,33 @@
+import pytest
+
+from sep2tools.event_examples import example_controls, example_default_control
+from sep2tools.event_overlap import condense_events
+from sep2tools.event_parallel import (
+    condense_events_parallel,
+    condense_programs_parallel,
+)
+
+
+def program_events(program: str) -> list:
+    return [example_default_control(program=program), *example_controls(program, 24)]
+
+
+def test_condense_events_parallel():
+    """Check condensing modes in other processes gives the same schedule"""
+    events = program_events("PRG")
+    schedule = condense_events_parallel(events, max_workers=2)
+    assert schedule == condense_events(events)
+
+
+def test_condense_programs_parallel():
+    events = {x: program_events(x) for x in ("PRG1", "PRG2", "EMPTY")}
+    events["EMPTY"] = []
+    schedules = condense_programs_parallel(events, max_workers=2)
+    assert list(schedules) == ["PRG1", "PRG2", "EMPTY"]
+    assert schedules["PRG1"] == condense_events(events["PRG1"])
+    assert schedules["PRG2"] == condense_events(events["PRG2"])
+    assert schedules["EMPTY"] == {}
+
+    assert condense_programs_parallel({}) == {}
+    with pytest.raises(ValueError):
+        condense_programs_parallel(events, backend="fortran")
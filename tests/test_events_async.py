@@ -0,0 +1,72 @@
+import asyncio
+
+from sqlite_utils import Database
+
+from sep2tools.event_examples import example_controls, example_default_control
+from sep2tools.events_async import AsyncEventsStore
+from sep2tools.events_db import EVENT_COLS
+
+
+async def poll_schedules(db_name: str) -> list[int]:
+    async with AsyncEventsStore(db_name, readers=2) as store:
+        default = example_default_control(program="PRG")
+        await store.add_events([default, *example_controls(program="PRG", num=12)])
+        polls = [store.get_mode_events("PRG", "opModExpLimW") for _ in range(10)]
+        results = await asyncio.gather(store.cleanup_events(), *polls)
+        assert await store.get_programs() == ["PRG"]
+        assert len(await store.get_program_modes("PRG")) == 2
+        assert len(await store.get_events("PRG", start=default.intervalStart)) == 13
+
+        await store.update_default(default.mRID, 999, 300)
+        await store.supersede_event(results[1][-1].mRID, "opModExpLimW")
+        await store.delete_event(results[1][-2].mRID)
+        await store.remove_old_events(retro_hours=1)
+        return [len(x) for x in results[1:]]
+
+
+def test_async_store(tmp_path):
+    """Check concurrent polls read full schedules while writes are serialized"""
+    db_name = str(tmp_path / "events.db")
+    num_events = asyncio.run(poll_schedules(db_name))
+    assert num_events == [13] * 10
+
+
+def test_async_memory_store():
+    """Check an in-memory store reads what it wrote, through one connection"""
+    num_events = asyncio.run(poll_schedules(":memory:"))
+    assert num_events == [13] * 10
+
+
+async def poll_active(db_name: str) -> tuple[list, list]:
+    async with AsyncEventsStore(db_name, readers=2) as store:
+        events = example_controls(program="PRG", num=12)
+        await store.add_events([example_default_control(program="PRG"), *events])
+        schedule = await store.get_mode_schedule("PRG", "opModExpLimW")
+        timestamps = [x.intervalStart + 60 for x in events]
+        polls = [store.get_active_control("PRG", "opModExpLimW", x) for x in timestamps]
+        active = await asyncio.gather(*polls)
+        return [x.mRID for x in schedule], [x.mRID for x in active]
+
+
+def test_async_store_schedule(tmp_path):
+    """Check schedule and active control reads match the stored events"""
+    schedule, active = asyncio.run(poll_active(str(tmp_path / "events.db")))
+    assert len(schedule) == 14
+    assert active == schedule[1:-1]
+
+
+async def first_polls(db_name: str) -> list:
+    async with AsyncEventsStore(db_name) as store:
+        polls = [store.get_programs() for _ in range(8)]
+        return await asyncio.gather(*polls, store.cleanup_events())
+
+
+def test_async_store_first_open(tmp_path):
+    """Check polls racing the schema setup of a new or old database wait for it"""
+    old_path = tmp_path / "old.db"
+    db = Database(old_path, strict=True)
+    db["events"].create(EVENT_COLS, pk=("mRID", "controlMode"))
+    db.close()
+    for db_path in (tmp_path / "new.db", old_path):
+        results = asyncio.run(first_polls(str(db_path)))
+        assert results == [[]] * 8 + [None]
@@ -0,0 +1,310 @@
+import pytest
+from sqlite_utils import Database
+
+from sep2tools.event_examples import (
+    example_control,
+    example_default_control,
+    example_schedule,
+)
+from sep2tools.events_backend import EventsBackend
+from sep2tools.events_db import (
+    EVENT_COLS,
+    MEMORY_DB,
+    MIGRATIONS,
+    EventsStore,
+    add_events,
+    cleanup_events,
+    close_stores,
+    get_mode_events,
+    get_mode_schedule,
+    get_store,
+    set_store,
+)
+from sep2tools.times import current_timestamp
+
+
+@pytest.fixture
+def store(tmp_path):
+    with EventsStore(str(tmp_path / "events.db")) as store:
+        yield store
+
+
+def test_store_reuses_connection(store):
+    """Check the store keeps one connection open between calls"""
+    default = example_default_control(program="PRG")
+    store.add_events([default])
+    conn = store.db.conn
+    assert store.get_programs() == ["PRG"]
+    assert sorted(store.get_program_modes("PRG")) == ["opModExpLimW", "opModImpLimW"]
+    assert store.db.conn is conn
+
+    store.close()
+    events = store.get_mode_events("PRG", "opModExpLimW")
+    assert [x.mRID for x in events] == [default.mRID]
+
+
+def test_store_updates(store):
+    default = example_default_control(program="PRG")
+    evt = example_control(default.intervalStart + 600, program="PRG")
+    store.add_events([default, evt])
+
+    store.supersede_event(evt.mRID, "opModExpLimW")
+    assert len(store.get_mode_events("PRG", "opModExpLimW")) == 1
+    assert len(store.get_mode_events("PRG", "opModImpLimW")) == 2
+
+    store.update_default(default.mRID, 999, 300)
+    events = store.get_mode_events("PRG", "opModExpLimW")
+    assert events[0].intervalDuration == 300
+
+    store.delete_event(evt.mRID)
+    assert len(store.get_mode_events("PRG", "opModImpLimW")) == 1
+
+
+def test_store_transaction_rollback(store):
+    evt = example_control(1780000000, program="PRG")
+    store.add_events([evt])
+    with pytest.raises(RuntimeError), store.transaction():
+        store.delete_event(evt.mRID)
+        raise RuntimeError
+    assert len(store.get_mode_events("PRG", "opModExpLimW")) == 1
+
+
+def test_store_transaction_rollback_schedule(store):
+    """Check schedules read inside a rolled back transaction aren't kept"""
+    default = example_default_control(program="PRG")
+    store.add_events([default])
+    assert len(store.get_mode_schedule("PRG", "opModExpLimW")) == 1
+    with pytest.raises(RuntimeError), store.transaction():
+        store.add_events([example_control(default.intervalStart + 600, program="PRG")])
+        assert len(store.get_mode_schedule("PRG", "opModExpLimW")) == 3
+        raise RuntimeError
+    assert len(store.get_mode_schedule("PRG", "opModExpLimW")) == 1
+
+
+def test_module_functions_share_store(tmp_path):
+    db_name = str(tmp_path / "shared.db")
+    store = get_store(db_name)
+    assert get_store(db_name) is store
+    store.add_events([example_default_control(program="PRG")])
+    assert len(get_mode_events("PRG", "opModExpLimW", db_name=db_name)) == 1
+    close_stores()
+    assert get_store(db_name) is not store
+
+
+def test_supersede_overlapping(store):
+    """Check only the latest of each duplicate interval is kept"""
+    start = 1780000000
+    evts = [example_control(start, program="PRG") for _ in range(3)]
+    for i, evt in enumerate(evts):
+        evt.creationTime += i
+    other = example_control(start + 300, program="PRG")
+    store.add_events([*evts, other])
+
+    stats = store.supersede_overlapping()
+    assert stats == {"groups": 2, "superseded": 4}
+    events = store.get_mode_events("PRG", "opModExpLimW")
+    assert [x.mRID for x in events] == [evts[2].mRID, other.mRID]
+
+    assert store.supersede_overlapping() == {"groups": 0, "superseded": 0}
+
+
+def test_cleanup_events(store):
+    """Check old defaults are completed and superseded events removed"""
+    defaults = [example_default_control(program="PRG") for _ in range(3)]
+    for i, evt in enumerate(defaults):
+        # Created a second apart if the clock ticked, so start from the first
+        evt.intervalStart = defaults[0].intervalStart + i * 1000
+    start = defaults[-1].intervalStart + 300
+    evts = [example_control(start, program="PRG") for _ in range(2)]
+    evts[1].creationTime += 1
+    store.add_events([*defaults, *evts])
+
+    store.cleanup_events()
+    events = store.get_mode_events("PRG", "opModExpLimW")
+    assert [x.mRID for x in events] == [x.mRID for x in [*defaults, evts[1]]]
+    assert [x.intervalDuration for x in events[:3]] == [999, 999, 999999999]
+    assert [x.currentStatus for x in events[:3]] == [999, 999, 1]
+
+    # Superseded rows are deleted, not just hidden
+    assert store.query("SELECT count(*) AS num FROM events")[0]["num"] == 8
+    assert store.query("PRAGMA journal_mode")[0]["journal_mode"] == "wal"
+
+
+def test_migrate_old_schema(tmp_path):
+    """Check a database with the original single column indexes is upgraded"""
+    db_path = tmp_path / "old.db"
+    db = Database(db_path, strict=True)
+    db["events"].create(EVENT_COLS, pk=("mRID", "controlMode"))
+    for col in ("mRID", "controlMode", "programName", "intervalStart"):
+        db["events"].create_index((col,))
+    db.close()
+
+    with EventsStore(str(db_path)) as store:
+        indexes = {x.name for x in store.db["events"].indexes}
+        assert "idx_events_mRID" not in indexes
+        assert "idx_events_mode_schedule" in indexes
+        assert "idx_events_intervalStart" in indexes
+        version = store.query("PRAGMA user_version")[0]["user_version"]
+        assert version == len(MIGRATIONS)
+
+
+def test_mode_events_query_plan(store):
+    """Check the schedule query is served in order from an index"""
+    sql = []
+    store.db.conn.set_trace_callback(sql.append)
+    store.get_mode_events("PRG", "opModExpLimW")
+    select = [x for x in sql if x.startswith("SELECT")][-1]
+    plan = store.query(f"EXPLAIN QUERY PLAN {select}")
+    details = " ".join(x["detail"] for x in plan)
+    assert "idx_events_mode_schedule" in details
+    assert "TEMP B-TREE" not in details
+
+
+def test_active_control_query_plan(store):
+    """Check the active control lookup range scans events ending after ts"""
+    default = example_default_control(program="PRG")
+    store.add_events([default])
+    sql = []
+    store.db.conn.set_trace_callback(sql.append)
+    active = store.get_active_control("PRG", "opModExpLimW", default.intervalStart)
+    assert active.mRID == default.mRID
+    select = [x for x in sql if x.startswith("SELECT")][-1]
+    plan = store.query(f"EXPLAIN QUERY PLAN {select}")
+    assert "idx_events_mode_end" in " ".join(x["detail"] for x in plan)
+
+
+def test_windowed_events(store):
+    """Check only events overlapping the window are returned"""
+    default = example_default_control(program="PRG")
+    start = default.intervalStart + 3600
+    evts = [example_control(start + i * 300, program="PRG") for i in range(4)]
+    store.add_events([default, *evts])
+
+    events = store.get_mode_events("PRG", "opModExpLimW", start=start + 300)
+    assert [x.mRID for x in events] == [default.mRID] + [x.mRID for x in evts[1:]]
+
+    window = (start + 300, start + 900)
+    events = store.get_mode_events("PRG", "opModExpLimW", *window)
+    assert [x.mRID for x in events] == [default.mRID] + [x.mRID for x in evts[1:3]]
+
+    events = store.get_events("PRG", end=start)
+    assert [x.mRID for x in events] == [default.mRID]
+
+    sql = []
+    store.db.conn.set_trace_callback(sql.append)
+    store.get_mode_events("PRG", "opModExpLimW", start=start)
+    select = [x for x in sql if x.startswith("SELECT")][-1]
+    plan = store.query(f"EXPLAIN QUERY PLAN {select}")
+    assert "idx_events_mode_end" in " ".join(x["detail"] for x in plan)
+
+
+def test_trusted_reads(store):
+    """Check trusted reads give the same events as validated ones"""
+    default = example_default_control(program="PRG")
+    events = [default, example_control(default.intervalStart + 600, program="PRG")]
+    store.add_events(events)
+    mode = "opModExpLimW"
+    validated = store.get_mode_events("PRG", mode)
+    # The repr also checks the fields are in the same order
+    assert repr(store.get_mode_events("PRG", mode, trusted=True)) == repr(validated)
+
+    rows = store.get_mode_event_rows("PRG", mode)
+    assert rows[0].mRID == validated[0].mRID
+    assert rows[0]._asdict() == validated[0].model_dump(exclude={"statusTime"})
+
+
+def test_get_events_groups_controls(store):
+    """Check each event is rebuilt once with all of its control modes"""
+    events = example_schedule(num_events=20, num_modes=4, start=1780000000)
+    store.add_events(events)
+    store.supersede_event(events[3].mRID, "opModGenLimW")
+
+    found = store.get_events("PRG0")
+    assert len(found) == len(events)
+    by_mrid = {x.mRID: x for x in found}
+    for evt in events:
+        controls = by_mrid[evt.mRID].controls
+        if evt.mRID == events[3].mRID:
+            assert [x.mode for x in controls] == [
+                "opModExpLimW",
+                "opModImpLimW",
+                "opModLoadLimW",
+            ]
+        else:
+            assert sorted(controls, key=lambda x: x.mode) == sorted(
+                evt.controls, key=lambda x: x.mode
+            )
+    starts = [(x.intervalStart, x.creationTime) for x in found]
+    assert starts == sorted(starts)
+
+    sql = []
+    store.db.conn.set_trace_callback(sql.append)
+    store.get_events("PRG0")
+    select = [x for x in sql if x.startswith("SELECT")][-1]
+    plan = store.query(f"EXPLAIN QUERY PLAN {select}")
+    assert "TEMP B-TREE" not in " ".join(x["detail"] for x in plan)
+
+
+def test_archive_events(store):
+    """Check completed events move to monthly archive tables"""
+    start = current_timestamp() - 10 * 86400
+    events = example_schedule(num_events=200, num_modes=2, overlap=0.05, start=start)
+    store.add_events(events)
+    assert store.query("PRAGMA auto_vacuum")[0]["auto_vacuum"] == 2  # Incremental
+    store.cleanup_events()
+    total = store.query("SELECT count(*) AS num FROM events")[0]["num"]
+
+    moved = store.archive_events(retro_hours=72)
+    assert moved > 0
+    tables = store.get_archive_tables()
+    assert tables
+    assert all(x.startswith("events_archive_20") for x in tables)
+    remaining = store.query("SELECT count(*) AS num FROM events")[0]["num"]
+    assert remaining
+    assert remaining + moved == total
+
+    archived = store.get_archived_events("PRG0", "opModExpLimW")
+    assert len(archived) == moved // 2
+    assert all(x.intervalEnd < current_timestamp() - 72 * 3600 for x in archived)
+    assert store.get_archived_events("PRG0", start=current_timestamp()) == []
+    assert store.get_archived_events("PRG0", end=start) == []
+
+    # Archiving again moves nothing, and removing frees the pages
+    assert store.archive_events(retro_hours=72) == 0
+    store.remove_old_events(retro_hours=0, archive=True)
+    assert len(store.get_archived_events("PRG0")) > len(archived) * 2
+    assert store.incremental_vacuum() == 0
+    with store.transaction(), pytest.raises(RuntimeError):
+        store.incremental_vacuum()
+
+
+def test_memory_store(tmp_path, monkeypatch):
+    """Check the in-memory store behaves the same as one on disk"""
+    monkeypatch.chdir(tmp_path)
+    events = example_schedule(num_events=50, num_modes=3, overlap=2)
+    mode = "opModGenLimW"
+    with EventsStore(str(tmp_path / "events.db")) as disk:
+        disk.add_events(events)
+        disk.cleanup_events()
+        expected = disk.get_mode_schedule("PRG0", mode)
+
+    store = get_store(MEMORY_DB)
+    assert isinstance(store, EventsBackend)
+    assert get_store(MEMORY_DB, sharded=None) is store
+    add_events(events, db_name=MEMORY_DB)
+    cleanup_events(db_name=MEMORY_DB)
+    assert get_mode_schedule("PRG0", mode, db_name=MEMORY_DB) == expected
+    assert list(tmp_path.iterdir()) == [tmp_path / "events.db"]
+
+    close_stores()  # Memory stores start again empty
+    assert get_mode_events("PRG0", mode, db_name=MEMORY_DB) == []
+
+
+def test_set_store(tmp_path):
+    """Check module functions route to a backend that was set"""
+    with EventsStore(MEMORY_DB) as backend:
+        set_store(backend, "custom.db")
+        add_events([example_default_control(program="PRG")], db_name="custom.db")
+        assert backend.get_programs() == ["PRG"]
+        assert get_store("custom.db", sharded=True) is backend
+    close_stores()
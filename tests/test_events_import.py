@@ -0,0 +1,78 @@
+from sep2tools.event_examples import example_controls
+from sep2tools.events_db import EventsStore
+from sep2tools.events_import import import_events
+
+EXAMPLE_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<DERControlList xmlns="urn:ieee:std:2030.5:ns" all="2" results="2" href="/derp/0/derc">
+  <DERControl href="/derp/0/derc/1" replyTo="/rsp" responseRequired="03">
+    <mRID>A1000000000000000000000000000001</mRID>
+    <description>Export limit</description>
+    <creationTime>1780000000</creationTime>
+    <EventStatus>
+      <currentStatus>0</currentStatus>
+      <dateTime>1780000000</dateTime>
+      <potentiallySuperseded>false</potentiallySuperseded>
+    </EventStatus>
+    <interval><duration>300</duration><start>1780000300</start></interval>
+    <randomizeStart>10</randomizeStart>
+    <DERControlBase>
+      <opModConnect>true</opModConnect>
+      <opModExpLimW><multiplier>3</multiplier><value>5</value></opModExpLimW>
+      <opModImpLimW><value>1500</value></opModImpLimW>
+    </DERControlBase>
+  </DERControl>
+  <DERControl href="/derp/0/derc/2">
+    <mRID>A1000000000000000000000000000002</mRID>
+    <creationTime>1780000000</creationTime>
+    <EventStatus><currentStatus>1</currentStatus><dateTime>0</dateTime></EventStatus>
+    <interval><duration>600</duration><start>1780000600</start></interval>
+    <DERControlBase>
+      <opModFixedPFInjectW>
+        <displacement>95</displacement><multiplier>-2</multiplier>
+      </opModFixedPFInjectW>
+      <opModFixedW>50</opModFixedW>
+      <opModVoltVar href="/derp/0/dc/1"/>
+    </DERControlBase>
+  </DERControl>
+</DERControlList>
+"""
+
+
+def test_import_json(tmp_path):
+    """Check newline-delimited JSON is imported in batches"""
+    json_path = tmp_path / "events.ndjson"
+    events = example_controls(program="PRG", num=25)
+    json_path.write_text("\n".join(x.model_dump_json() for x in events) + "\n\n")
+
+    db_name = str(tmp_path / "events.db")
+    counts = []
+    num = import_events(
+        json_path, batch_size=10, progress=counts.append, db_name=db_name
+    )
+    assert num == 25
+    assert counts == [10, 20, 25]
+    with EventsStore(db_name) as store:
+        assert len(store.get_events("PRG")) == 25
+
+
+def test_import_xml(tmp_path):
+    xml_path = tmp_path / "derc.xml"
+    xml_path.write_text(EXAMPLE_XML)
+
+    db_name = str(tmp_path / "events.db")
+    assert import_events(xml_path, program="PRG", primacy=2, db_name=db_name) == 2
+    with EventsStore(db_name) as store:
+        exp = store.get_mode_events("PRG", "opModExpLimW")
+        assert len(exp) == 1
+        assert exp[0].controlValue == 5
+        assert exp[0].controlMultiplier == 3
+        assert exp[0].programPrimacy == 2
+        assert exp[0].randomizeStart == 10
+        connect = store.get_mode_events("PRG", "opModConnect")
+        assert connect[0].controlValue == 1
+        fixed = store.get_mode_events("PRG", "opModFixedW")
+        assert fixed[0].intervalDuration == 600
+        assert fixed[0].currentStatus == 1
+        pf = store.get_mode_events("PRG", "opModFixedPFInjectW")
+        assert (pf[0].controlValue, pf[0].controlMultiplier) == (95, -2)
+        assert "opModVoltVar" not in store.get_program_modes("PRG")
@@ -0,0 +1,114 @@
+from pathlib import Path
+
+import pytest
+
+from sep2tools import events_db, events_sharded
+from sep2tools.event_examples import example_schedule
+from sep2tools.events_backend import EventsBackend
+from sep2tools.events_db import EventsStore, get_store
+from sep2tools.events_sharded import ShardedEventsStore
+from sep2tools.times import current_timestamp
+
+
+@pytest.fixture
+def events():
+    start = current_timestamp() - 86400
+    events = example_schedule(num_events=90, num_programs=3, overlap=2, start=start)
+    events[-1].programName = "PRG/2"  # Escaped in the file name
+    return events
+
+
+def test_sharded_matches_single_store(tmp_path, events):
+    """Check routing by program gives the same results as one database"""
+    mode = "opModExpLimW"
+    with (
+        ShardedEventsStore(str(tmp_path / "events.db")) as sharded,
+        EventsStore(str(tmp_path / "single.db")) as single,
+    ):
+        sharded.add_events(events)
+        single.add_events(events)
+        files = sorted(x.name for x in (tmp_path / "events_shards").glob("*.db"))
+        assert files == [
+            "shard_PRG%2F2.db",
+            "shard_PRG0.db",
+            "shard_PRG1.db",
+            "shard_PRG2.db",
+        ]
+
+        assert sorted(sharded.get_programs()) == sorted(single.get_programs())
+        assert sharded.supersede_overlapping() == single.supersede_overlapping()
+        sharded.cleanup_events()
+        single.cleanup_events()
+        for program in single.get_programs():
+            assert sharded.get_program_modes(program) == single.get_program_modes(
+                program
+            )
+            assert sharded.get_events(program) == single.get_events(program)
+            assert sharded.get_mode_events(program, mode) == single.get_mode_events(
+                program, mode
+            )
+            assert sharded.get_mode_event_rows(program, mode) == (
+                single.get_mode_event_rows(program, mode)
+            )
+            assert sharded.get_mode_schedule(program, mode) == (
+                single.get_mode_schedule(program, mode)
+            )
+            ts = current_timestamp()
+            assert sharded.get_active_control(program, mode, ts) == (
+                single.get_active_control(program, mode, ts)
+            )
+
+        sql = "SELECT count(*) AS num FROM events"
+        assert sum(x["num"] for x in sharded.query(sql)) == single.query(sql)[0]["num"]
+        assert sharded.execute(
+            "UPDATE events SET randomizeStart = 0"
+        ) == single.execute("UPDATE events SET randomizeStart = 0")
+
+        sharded.delete_event(events[1].mRID)
+        sharded.supersede_event(events[2].mRID, mode)
+        sharded.update_default(events[0].mRID, 1, 999999999)
+        assert events[1].mRID not in {x.mRID for x in sharded.get_events("PRG0")}
+        assert sharded.cleanup_defaults() == 0
+        sharded.delete_superseded()
+        sharded.update_status()
+        assert sharded.archive_events(retro_hours=0) > 0
+        sharded.remove_old_events(retro_hours=0)
+        sharded.vacuum()
+        assert sharded.incremental_vacuum() == 0
+        assert sharded.get_archived_events("PRG0", mode)
+
+
+def test_sharded_reads_unknown_program(tmp_path, events):
+    """Check reads for a program without a database don't create one"""
+    with ShardedEventsStore(str(tmp_path / "events.db")) as sharded:
+        assert sharded.get_programs() == []
+        assert sharded.get_mode_schedule("NOTAPRG", "opModExpLimW") == []
+        assert sharded.get_active_control("NOTAPRG", "opModExpLimW", 0) is None
+        assert not sharded.shard_path("NOTAPRG").exists()
+        sharded.add_events(events)
+
+    # Shards written before are found again
+    with ShardedEventsStore(str(tmp_path / "events.db")) as sharded:
+        assert sorted(sharded.get_programs()) == ["PRG/2", "PRG0", "PRG1", "PRG2"]
+
+
+def test_get_sharded_store(tmp_path):
+    name = str(tmp_path / "events.db")
+    store = get_store(name, sharded=True)
+    assert isinstance(store, ShardedEventsStore)
+    assert isinstance(store, EventsBackend)
+    assert get_store(name, sharded=True) is store
+    assert isinstance(get_store(name, sharded=False), EventsStore)
+
+
+def test_sharded_relative_events_dir(tmp_path, monkeypatch, events):
+    """Check shards are found when the events directory is a relative path"""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    for module in (events_db, events_sharded):
+        monkeypatch.setattr(module, "EVENTS_DB_DIR", Path("data"))
+    with ShardedEventsStore() as sharded:
+        sharded.add_events(events)
+        assert sharded.shard_path("PRG0") == Path("data/events_shards/shard_PRG0.db")
+        assert sharded.shard_path("PRG0").exists()
+        assert len(sharded.get_programs()) == 4
@@ -0,0 +1,49 @@
+from sep2tools.event_examples import example_controls, example_default_control
+from sep2tools.event_overlap import condense_events
+from sep2tools.events_db import EventsStore
+from sep2tools.fleet import resolve_fleet_from_db, resolve_fleet_schedules
+
+DEVICES = {
+    "DEV1": ["PRG1"],
+    "DEV2": ["PRG1", "PRG2"],
+    "DEV3": ["PRG2", "PRG1"],
+    "DEV4": ["PRG3"],
+    "DEV5": [],
+}
+
+
+def program_events() -> dict[str, list]:
+    events = {}
+    for primacy, program in enumerate(("PRG1", "PRG2", "PRG3"), start=1):
+        events[program] = [
+            example_default_control(program=program, primacy=primacy),
+            *example_controls(program=program, num=12 * primacy),
+        ]
+        for evt in events[program]:
+            evt.programPrimacy = primacy
+    events["PRG1"].pop(0)  # Only the events, so the PRG2 default shows through
+    return events
+
+
+def test_resolve_fleet():
+    """Check device schedules match condensing all their programs together"""
+    events = program_events()
+    schedules = resolve_fleet_schedules(DEVICES, events)
+    assert schedules["DEV1"] == condense_events(events["PRG1"])
+    assert schedules["DEV2"] == condense_events(events["PRG1"] + events["PRG2"])
+    assert schedules["DEV3"] is schedules["DEV2"]  # Shared
+    assert schedules["DEV5"] == {}
+
+    # Lower primacy wins while it has events, the other program after that
+    exp = schedules["DEV2"]["opModExpLimW"]
+    assert {x.programName for x in exp} == {"PRG1", "PRG2"}
+
+
+def test_resolve_fleet_from_db(tmp_path):
+    events = program_events()
+    db_name = str(tmp_path / "events.db")
+    with EventsStore(db_name) as store:
+        for x in events.values():
+            store.add_events(x)
+    schedules = resolve_fleet_from_db(DEVICES, db_name=db_name)
+    assert schedules == resolve_fleet_schedules(DEVICES, events)
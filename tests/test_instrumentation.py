@@ -0,0 +1,100 @@
+import pytest
+
+from sep2tools import instrumentation
+from sep2tools.event_examples import (
+    example_control,
+    example_controls,
+    example_default_control,
+)
+from sep2tools.event_overlap import condense_events
+from sep2tools.events_db import EventsStore
+from sep2tools.times import current_timestamp
+
+
+@pytest.fixture
+def metrics():
+    instrumentation.reset()
+    yield instrumentation
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+def test_disabled_records_nothing(metrics):
+    condense_events([example_default_control()])
+    assert not metrics.is_enabled()
+    assert metrics.snapshot() == {"function": {}, "sql": {}}
+
+
+def test_records_hot_paths(metrics, tmp_path):
+    calls = []
+    metrics.enable(lambda *args: calls.append(args))
+    events = [example_default_control(program="PRG"), *example_controls("PRG", 12)]
+    with EventsStore(str(tmp_path / "events.db")) as store:
+        store.add_events(events)
+        schedule = store.get_mode_schedule("PRG", "opModExpLimW")
+
+    snap = metrics.snapshot()
+    funcs = snap["function"]
+    for name in (
+        "events_db.add_events",
+        "events_db.get_mode_schedule",
+        "events_db.get_mode_events",
+        "events_db.rows_to_mode_events_trusted",
+        "event_overlap.condense_mode_events",
+    ):
+        assert funcs[name]["count"] == 1
+        assert funcs[name]["buckets"]["+Inf"] == 1
+    assert funcs["events_db.rows_to_mode_events_trusted"]["rows"] == 13
+    assert funcs["events_db.get_mode_schedule"]["rows"] == len(schedule)
+    assert any("FROM events WHERE programName" in name for name in snap["sql"])
+    assert ("function", "events_db.add_events") in [x[:2] for x in calls]
+
+    text = metrics.prometheus_text()
+    assert "# TYPE sep2tools_function_seconds histogram" in text
+    rows_metric = "sep2tools_function_rows_total"
+    assert f'{rows_metric}{{function="events_db.add_events"}} 0' in text
+    assert 'sep2tools_function_seconds_count{function="events_db.add_events"} 1' in text
+
+    metrics.disable()
+    condense_events(events)
+    assert "event_overlap.condense_events" not in metrics.snapshot()["function"]
+
+
+def test_records_write_statements(metrics):
+    """Check the inserts, cleanup and archive statements are timed"""
+    metrics.enable()
+    with EventsStore(":memory:") as store:
+        store.add_events([example_control(current_timestamp() - 7200, program="PRG")])
+        store.cleanup_events()
+        assert store.archive_events(retro_hours=1, cleanup=False) == 2
+
+    sql = metrics.snapshot()["sql"]
+    for statement in (
+        "INSERT OR REPLACE INTO events (",
+        "UPDATE events SET currentStatus = 4",
+        "INSERT OR REPLACE INTO events_archive_",
+        "DELETE FROM events WHERE currentStatus NOT IN (0,1)",
+    ):
+        assert any(statement in name for name in sql), statement
+    insert = next(x for name, x in sql.items() if "INTO events (" in name)
+    assert insert["rows"] == 2
+
+
+def test_callbacks(metrics):
+    calls = []
+
+    def callback(*args):
+        calls.append(args)
+
+    metrics.add_callback(callback)
+    metrics.record("sql", 'SELECT "a"\n', 0.002, 3)
+    metrics.remove_callback(callback)
+    metrics.record("sql", 'SELECT "a"\n', 20.0)
+    assert len(calls) == 1
+    snap = metrics.snapshot()["sql"]['SELECT "a"\n']
+    assert snap["count"] == 2
+    assert snap["rows"] == 3
+    assert snap["buckets"][0.001] == 0
+    assert snap["buckets"][0.0025] == 1
+    assert snap["buckets"]["+Inf"] == 2
+    assert 'sql="SELECT \\"a\\"\\n"' in metrics.prometheus_text()
@@ -0,0 +1,125 @@
+import math
+import random
+
+import pytest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+from sep2tools.event_examples import example_controls, example_default_control
+from sep2tools.event_models import CurrentStatus, DERModeControl
+from sep2tools.event_overlap import condense_mode_events
+from sep2tools.events_db import get_store
+from sep2tools.resample import (
+    get_mode_resampled,
+    interval_grid,
+    resample_mode_events,
+    resample_schedules,
+)
+
+BACKENDS = [
+    "python",
+    pytest.param("numpy", marks=pytest.mark.skipif(numpy is None, reason="numpy")),
+]
+
+
+def random_schedule(rng: random.Random, num: int) -> list[DERModeControl]:
+    events = [
+        DERModeControl(
+            mRID=str(i),
+            programPrimacy=rng.randint(0, 3),
+            creationTime=rng.randint(0, 5),
+            currentStatus=CurrentStatus(0),
+            intervalStart=rng.randrange(0, 1200, 7),
+            intervalDuration=rng.randrange(0, 400, 7),
+            controlMode="opModExpLimW",
+            controlValue=rng.randint(0, 100),
+            controlMultiplier=rng.randint(-1, 1),
+        )
+        for i in range(num)
+    ]
+    return condense_mode_events(events)
+
+
+def reference_resample(events, start, end, interval_min, method):
+    """Evaluate each second of each interval"""
+    step = interval_min * 60
+    grid_start, num = interval_grid(start, end, interval_min)
+    result = []
+    for i in range(num):
+        interval_start = grid_start + i * step
+        seconds = []
+        for ts in range(interval_start, interval_start + step):
+            active = [x for x in events if x.intervalStart <= ts < x.intervalEnd]
+            if active:
+                evt = active[0]
+                seconds.append(evt.controlValue * 10.0**evt.controlMultiplier)
+            elif ts == interval_start:
+                seconds.append(None)
+        if method == "start":
+            result.append(seconds[0])
+            continue
+        seconds = [x for x in seconds if x is not None]
+        if not seconds:
+            result.append(None)
+        elif method == "min":
+            result.append(min(seconds))
+        else:
+            result.append(sum(seconds) / len(seconds))
+    return result
+
+
+def assert_series_equal(series, expected):
+    assert len(series) == len(expected)
+    for value, exp in zip(series, expected, strict=True):
+        if exp is None:
+            assert math.isnan(value)
+        else:
+            assert value == pytest.approx(exp)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("method", ["start", "min", "mean"])
+def test_resample_matches_reference(backend, method):
+    rng = random.Random(2040)
+    for num in (0, 1, 3, 10):
+        for _ in range(5):
+            events = random_schedule(rng, num)
+            series = resample_mode_events(
+                events, 30, 1290, interval_min=1, method=method, backend=backend
+            )
+            expected = reference_resample(events, 30, 1290, 1, method)
+            assert_series_equal(series, expected)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_resample_schedules(backend, tmp_path):
+    events = [example_default_control(), *example_controls(num=12)]
+    start = events[1].intervalStart
+    end = start + 7200
+    db_name = str(tmp_path / "events.db")
+    store = get_store(db_name)
+    store.add_events(events)
+    schedules = {
+        mode: store.get_mode_schedule("EXAMPLEPRG", mode)
+        for mode in ("opModExpLimW", "opModImpLimW")
+    }
+    series = resample_schedules(schedules, start, end, 5, "min", backend=backend)
+    assert len(series["opModExpLimW"]) == 24
+    assert list(series["opModExpLimW"][:12]) == [
+        x.controls[0].value for x in events[1:]
+    ]
+    assert series["opModImpLimW"][-1] == 1500
+
+    db_series = get_mode_resampled(
+        "EXAMPLEPRG", "opModExpLimW", start, end, 5, "min", backend, db_name
+    )
+    assert list(db_series) == list(series["opModExpLimW"])
+
+
+def test_resample_unknown():
+    with pytest.raises(ValueError):
+        resample_mode_events([], 0, 600, method="median")
+    with pytest.raises(ValueError):
+        resample_mode_events([], 0, 600, backend="fortran")
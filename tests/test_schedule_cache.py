@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from sep2tools.event_examples import example_control, example_default_control
+from sep2tools.event_overlap import condense_mode_events
+from sep2tools.events_db import EventsStore
+
+MODE = "opModExpLimW"
+
+
+def full_schedule(store: EventsStore) -> list[tuple]:
+    events = condense_mode_events(store.get_mode_events("PRG", MODE))
+    return [
+        (x.mRID, x.intervalStart, x.intervalDuration, x.controlValue) for x in events
+    ]
+
+
+def cached_schedule(store: EventsStore, **kwargs) -> list[tuple]:
+    events = store.get_mode_schedule("PRG", MODE, **kwargs)
+    return [
+        (x.mRID, x.intervalStart, x.intervalDuration, x.controlValue) for x in events
+    ]
+
+
+@pytest.fixture
+def store(tmp_path):
+    with EventsStore(str(tmp_path / "events.db")) as store:
+        yield store
+
+
+def test_incremental_schedule(store):
+    """Check patching the cached schedule matches condensing from scratch"""
+    rng = random.Random(2032)
+    default = example_default_control(program="PRG")
+    start = default.intervalStart
+    store.add_events([default])
+    mrids = []
+    for _ in range(60):
+        assert cached_schedule(store) == full_schedule(store)
+        action = rng.random()
+        if action < 0.6 or not mrids:
+            evt_start = start + rng.randrange(0, 7200, 300)
+            evt = example_control(
+                evt_start, rng.randrange(300, 1800, 300), program="PRG"
+            )
+            evt.programPrimacy = rng.randint(0, 2)
+            evt.creationTime += rng.randint(0, 10)
+            if mrids and rng.random() < 0.2:
+                evt.mRID = rng.choice(mrids)  # Replace an event with new times
+            store.add_events([evt])
+            mrids.append(evt.mRID)
+        elif action < 0.75:
+            store.supersede_event(rng.choice(mrids), MODE)
+        elif action < 0.9:
+            store.delete_event(rng.choice(mrids))
+        else:
+            store.update_default(default.mRID, 1, rng.randrange(3600, 7200, 300))
+    assert cached_schedule(store) == full_schedule(store)
+
+    window = {"start": start + 1800, "end": start + 3600}
+    expected = [x for x in full_schedule(store) if x[1] < window["end"]]
+    expected = [x for x in expected if x[1] + x[2] > window["start"]]
+    assert cached_schedule(store, **window) == expected
+
+
+def test_schedule_other_connection(store):
+    """Check writes from another connection reset the cached schedules"""
+    default = example_default_control(program="PRG")
+    store.add_events([default])
+    assert len(cached_schedule(store)) == 1
+
+    with EventsStore(store.name) as other:
+        other.add_events([example_control(default.intervalStart + 600, program="PRG")])
+    assert len(cached_schedule(store)) == 3
+
+    store.cleanup_events()
+    assert cached_schedule(store) == full_schedule(store)
@@ -0,0 +1,43 @@
+import pickle
+
+from sep2tools.event_examples import example_controls, example_default_control
+from sep2tools.event_overlap import condense_timeline
+from sep2tools.events_db import row_to_mode_event
+from sep2tools.timeline import ModeTimeline
+
+
+def example_timelines() -> tuple[list, dict[str, ModeTimeline]]:
+    events = [example_default_control(), *example_controls(num=12)]
+    return events, ModeTimeline.from_events(events)
+
+
+def test_timeline_round_trip():
+    """Check events convert to arrays and back without losing anything"""
+    events, timelines = example_timelines()
+    assert list(timelines) == ["opModExpLimW", "opModImpLimW"]
+    exp = timelines["opModExpLimW"]
+    assert len(exp) == 13
+    assert exp.mrid_lookup[events[3].mRID] == 3
+
+    mode_events = exp.to_mode_events()
+    assert mode_events[0].isDefault
+    assert mode_events[5].controlValue == events[5].controls[0].value
+    rebuilt = ModeTimeline.from_mode_events(mode_events).to_mode_events()
+    assert [x.model_dump() for x in rebuilt] == [x.model_dump() for x in mode_events]
+    assert ModeTimeline.from_mode_events([]).to_mode_events() == []
+
+
+def test_timeline_pickle():
+    _, timelines = example_timelines()
+    exp = condense_timeline(timelines["opModExpLimW"])
+    copy = pickle.loads(pickle.dumps(exp))
+    assert [x.model_dump() for x in copy.to_mode_events()] == [
+        x.model_dump() for x in exp.to_mode_events()
+    ]
+
+
+def test_timeline_matches_validated_models():
+    """Check models built without validation match validated ones"""
+    _, timelines = example_timelines()
+    for evt in timelines["opModImpLimW"].to_mode_events():
+        assert row_to_mode_event(evt.model_dump()) == evt
@@ -1,10 +1,14 @@
 from datetime import date
 
+import pytest
+
 from sep2tools.times import (
     current_timestamp,
     day_time_range,
     event_days,
+    get_timezone,
     timestamp_local_dt,
+    timestamps_local_dt,
 )
 
 
@@ -34,3 +38,33 @@ def test_day_range():
     start, end = day_time_range(day)
     assert start == 1779976800
     assert end == 1780063200
+
+
+@pytest.mark.parametrize("backend", ["zoneinfo", "dateutil"])
+@pytest.mark.parametrize("zone", ["Australia/Sydney", "Australia/Brisbane", "UTC"])
+def test_batch_conversion(zone, backend):
+    """Check batch conversion matches one at a time, including DST changes"""
+    tzinfo = get_timezone(zone, backend=backend)
+    timestamps = [
+        *range(1775318400 - 7200, 1775318400 + 7200, 300),  # Sydney DST ends
+        *range(1791043200 - 7200, 1791043200 + 7200, 300),  # Sydney DST starts
+        1767225599,  # Year boundaries
+        1767225600,
+        1798761600,
+        1780000000,
+    ]
+    expected = [timestamp_local_dt(x, tzinfo=tzinfo) for x in timestamps]
+    converted = timestamps_local_dt(timestamps, tzinfo=tzinfo)
+    for dt, exp in zip(converted, expected, strict=True):
+        assert dt.replace(tzinfo=None) == exp.replace(tzinfo=None)
+        assert dt.fold == exp.fold
+        assert dt.utcoffset() == exp.utcoffset()
+        assert dt.timestamp() == exp.timestamp()
+
+    naive = timestamps_local_dt(timestamps, tzinfo=tzinfo, strip_tz=True)
+    assert naive == [x.replace(tzinfo=None) for x in expected]
+
+
+def test_timezone_backend():
+    with pytest.raises(ValueError):
+        get_timezone("Australia/Brisbane", backend="pytz")